@@ -0,0 +1,340 @@
+"""Benchmarks for bytestr.py
+
+Usage: python bench_bytestr.py [benchmark ...] [--max-size BYTES] [--legacy-max-size BYTES]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+import tracemalloc
+
+from bytestr import bytestr
+
+
+SIZES = tuple(1024 * 32**i for i in range(5))  # 1 KB to 1 GB
+
+
+def fmt_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.3g} {unit}"
+        size /= 1024
+
+
+def timed(fn, *args):
+    start = perf_counter()
+    fn(*args)
+    return perf_counter() - start
+
+
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(title, columns, rows):
+    print(f"\n{title}")
+    print("".join(f"{col:>16}" for col in columns))
+    for row in rows:
+        print("".join(f"{cell:>16}" for cell in row))
+
+
+####LEGACY IMPLEMENTATIONS####
+def legacy_set_all(byteslike_obj, int_func, *args):
+    # Per-index loop used by set_all/destroy/clearmem before the bulk wipe engine
+    for i in range(len(byteslike_obj)):
+        byteslike_obj[i] = int_func(*args) if args else int_func
+
+
+def legacy_extend(bytestr_obj, seq):
+    # Int-at-a-time append used by extend/__iadd__ before the slice fast path
+    for item in seq:
+        for _int in bytestr.parse_arg(item, valid_types=(int,)):
+            bytearray.append(bytestr_obj, _int)
+
+
+def legacy_insert(bytestr_obj, index, item):
+    # Int-at-a-time insert used by insert/__radd__ before the slice fast path
+    for i, _int in enumerate(bytestr.parse_arg(item, valid_types=(int,))):
+        bytearray.insert(bytestr_obj, index + i, _int)
+
+
+def legacy_replace(bytestr_obj, old, new):
+    # find + del + insert loop that restarted the search from 0 for every match
+    max_count = bytearray.count(bytestr_obj, old)
+    actual_count = 0
+    sub_index = bytearray.find(bytestr_obj, old)
+    while sub_index >= 0 and actual_count < max_count:
+        del bytestr_obj[sub_index:sub_index + len(old)]
+        legacy_insert(bytestr_obj, sub_index, new)
+        sub_index = bytearray.find(bytestr_obj, old)
+        actual_count += 1
+
+
+def legacy_upper(bytestr_obj):
+    # set_all with a per-byte chr().upper() lambda
+    bytestr.set_all(bytestr_obj, lambda i: ord(chr(bytestr_obj[i]).upper()), set_by_index=True)
+
+
+def legacy_center(bytestr_obj, width, fill=" "):
+    # One insert at the front and one append per loop iteration
+    while len(bytestr_obj) < width:
+        legacy_insert(bytestr_obj, 0, fill)
+        if len(bytestr_obj) < width:
+            bytestr_obj.append(fill)
+
+
+####BENCHMARKS####
+def bench_wipe(max_size, legacy_max_size):
+    """Zero and random wipe throughput of fill/fill_random vs the per-index loop"""
+    rows = []
+    for size in (s for s in SIZES if s <= max_size):
+        buf = bytearray(size)
+        fill = timed(bytestr.fill, buf, 0)
+        fill_random = timed(bytestr.fill_random, buf)
+        legacy = timed(legacy_set_all, buf, 0) if size <= legacy_max_size else None
+        bytestr.fill(buf, 0)
+        del buf
+
+        mb = size / 2**20
+        rows.append((fmt_size(size),
+                     f"{mb / fill:,.0f} MB/s",
+                     f"{mb / fill_random:,.0f} MB/s",
+                     f"{mb / legacy:,.1f} MB/s" if legacy else "skipped",
+                     f"{legacy / fill:,.0f}x" if legacy else "-"))
+    report("wipe throughput", ("size", "fill", "fill_random", "per-index", "speedup"), rows)
+
+
+def bench_concat(max_size, legacy_max_size, chunk_size=64):
+    """Building a bytestr from many small appends and one large prepend"""
+    rows = []
+    chunk = b"x" * chunk_size
+    for size in (s for s in SIZES[:4] if s <= max_size):
+        def append_chunks(fn):
+            result = bytestr()
+            for _ in range(size // chunk_size):
+                fn(result, chunk)
+            result.clearmem()
+
+        def prepend(fn):
+            result = bytestr(b"y" * (size // 2))
+            fn(result, 0, b"z" * (size // 2))
+            result.clearmem()
+
+        append = timed(append_chunks, bytestr.extend)
+        radd = timed(prepend, bytestr.insert)
+        legacy = timed(append_chunks, legacy_extend) if size <= legacy_max_size else None
+        legacy_radd = timed(prepend, legacy_insert) if size <= legacy_max_size // 32 else None
+
+        rows.append((fmt_size(size),
+                     f"{append / size * 1e9:,.1f} ns/B",
+                     f"{legacy / size * 1e9:,.1f} ns/B" if legacy else "skipped",
+                     f"{radd / size * 1e9:,.2f} ns/B",
+                     f"{legacy_radd / size * 1e9:,.1f} ns/B" if legacy_radd else "skipped"))
+    report(f"concatenation ({chunk_size} B chunks, time per byte stays flat when O(n))",
+           ("size", "+=", "legacy +=", "radd", "legacy radd"), rows)
+
+
+def bench_growth(max_size, legacy_max_size, chunk_size=16):
+    """Reallocations while a secret grows a few bytes at a time"""
+    rows = []
+    chunk = b"x" * chunk_size
+    for size in (s for s in SIZES[:4] if s <= max_size):
+        plain, plain_reallocs, capacity = bytearray(), 0, 0
+        for _ in range(size // chunk_size):
+            plain += chunk
+            if plain.__sizeof__() != capacity:
+                plain_reallocs, capacity = plain_reallocs + 1, plain.__sizeof__()
+        bytestr.fill(plain, 0)
+
+        result = bytestr()
+        for _ in range(size // chunk_size):
+            result += chunk
+        rows.append((fmt_size(size), plain_reallocs, result.reallocs))
+        result.clearmem()
+    report(f"reallocations ({chunk_size} B appends, only bytestr wipes the old buffer)",
+           ("size", "bytearray", "bytestr"), rows)
+
+
+def bench_locked(max_size, legacy_max_size, count=20000):
+    """Allocations per second of locked slabs vs bytearray and one mmap per secret"""
+    import mmap
+    from securemem import LockedBytestr, lock_region, unlock_region
+
+    def plain(size):
+        buf = bytearray(size)
+        bytestr.fill(buf, 0)
+
+    def locked(size):
+        LockedBytestr(capacity=size).destroy()
+
+    def mmap_per_secret(size):
+        region = mmap.mmap(-1, size)
+        lock_region(region)
+        unlock_region(region)
+        region.close()
+
+    rows = []
+    for size in (32, 256, 4096):
+        rates = [count / timed(lambda: [fn(size) for _ in range(count)])
+                 for fn in (plain, locked, mmap_per_secret)]
+        rows.append((fmt_size(size), *(f"{rate:,.0f}/s" for rate in rates)))
+    report("allocate + wipe + free", ("size", "bytearray", "LockedBytestr", "mmap+mlock"), rows)
+
+
+def bench_pool(max_size, legacy_max_size, rounds=200):
+    """Short-lived temporaries from split/copy with and without releasing them to the pool"""
+    from bytestr import BytestrPool
+
+    def churn(release):
+        for _ in range(rounds):
+            pieces = bytestr(line).split(",")
+            while pieces:
+                piece = pieces.pop()
+                if release:
+                    bytestr.pool.release(piece)
+                del piece
+
+    rows = []
+    for tokens in (10, 100, 1000):
+        line = ",".join("secret-token-%d" % i for i in range(tokens))
+        bytestr.pool = BytestrPool()
+        fresh = timed(churn, False)
+        bytestr.pool = BytestrPool()
+        pooled = timed(churn, True)
+        stats = bytestr.pool.stats
+        rows.append((tokens, f"{rounds * tokens / fresh:,.0f}/s", f"{rounds * tokens / pooled:,.0f}/s",
+                     stats["hits"], stats["misses"], stats["evictions"]))
+    report("split temporaries", ("tokens", "no release", "release", "hits", "misses", "evictions"), rows)
+
+
+def bench_view(max_size, legacy_max_size, token_size=32):
+    """Peak memory of tokenizing a secret with split copies vs bytestrviews"""
+    def split_tokens(secret):
+        pieces = secret.split(",")
+        return len(pieces)
+
+    def view_tokens(secret):
+        views, start = [], 0
+        while start <= len(secret):
+            stop = secret.find(",", start)
+            stop = len(secret) if stop < 0 else stop
+            views.append(secret.view(start, stop))
+            start = stop + 1
+        return len(views)
+
+    rows = []
+    for size in (s for s in SIZES[1:4] if s <= max_size):
+        secret = bytestr(b",".join([b"k" * (token_size - 1)] * (size // token_size)))
+        split_peak = peak_memory(split_tokens, secret)
+        view_peak = peak_memory(view_tokens, secret)
+        split_time = timed(split_tokens, secret)
+        view_time = timed(view_tokens, secret)
+        secret.clearmem()
+        rows.append((fmt_size(size), fmt_size(split_peak), fmt_size(view_peak),
+                     f"{split_time * 1e3:,.1f} ms", f"{view_time * 1e3:,.1f} ms"))
+    report(f"tokenize ({token_size} B tokens)",
+           ("size", "split peak", "view peak", "split", "view"), rows)
+
+
+def bench_isplit(max_size, legacy_max_size, line_size=64):
+    """Peak memory of walking every line of a credential file"""
+    def walk(pieces):
+        total = 0
+        for piece in pieces:
+            total += len(piece)
+        return total
+
+    rows = []
+    for size in (s for s in SIZES[1:4] if s <= max_size):
+        secret = bytestr(b"\n".join([b"user:" + b"p" * (line_size - 6)] * (size // line_size)))
+        peaks = [peak_memory(lambda: walk(fn())) for fn in (lambda: secret.split("\n"),
+                                                            lambda: secret.isplit("\n"),
+                                                            lambda: secret.isplit("\n", as_view=True))]
+        secret.clearmem()
+        rows.append((fmt_size(size), *(fmt_size(peak) for peak in peaks)))
+    report(f"split lines ({line_size} B lines)", ("size", "split", "isplit", "isplit views"), rows)
+
+
+def bench_replace(max_size, legacy_max_size, spacing=64):
+    """Many small replacements spread over a large buffer"""
+    rows = []
+    for size in (s for s in SIZES[:4] if s <= max_size):
+        source = (b"k" * (spacing - 2) + b"{}") * (size // spacing)
+        cells = []
+        for new in (b"", b"..", b"...."):
+            cells.append(timed(bytestr(source).replace, "{}", new))
+        legacy = (timed(legacy_replace, bytestr(source), b"{}", b"....")
+                  if size <= legacy_max_size // 32 else None)
+        rows.append((fmt_size(size), size // spacing,
+                     *(f"{cell * 1e3:,.2f} ms" for cell in cells),
+                     f"{legacy * 1e3:,.2f} ms" if legacy else "skipped"))
+    report(f"replace a 2 B match every {spacing} B",
+           ("size", "matches", "shrink", "same size", "grow", "legacy grow"), rows)
+
+
+def bench_case(max_size, legacy_max_size):
+    """Case conversion throughput of the translation tables vs the per-byte lambda"""
+    rows = []
+    for size in (s for s in SIZES if s <= max_size):
+        buf = bytestr(b"0123456789abcdef" * (size // 16))
+        ascii_upper = timed(buf.upper, "ascii")
+        latin1_lower = timed(buf.lower, "latin-1")
+        legacy = timed(legacy_upper, buf) if size <= legacy_max_size else None
+        buf.clearmem()
+
+        mb = size / 2**20
+        rows.append((fmt_size(size),
+                     f"{mb / ascii_upper:,.0f} MB/s",
+                     f"{mb / latin1_lower:,.0f} MB/s",
+                     f"{mb / legacy:,.1f} MB/s" if legacy else "skipped"))
+    report("case conversion", ("size", "upper ascii", "lower latin-1", "per-byte"), rows)
+
+
+def bench_pad(max_size, legacy_max_size, key_size=64):
+    """Padding a short key out to a fixed width and stripping it back"""
+    rows = []
+    for size in (s for s in SIZES[:4] if s <= max_size):
+        key = b"k" * key_size
+        center = timed(bytestr(key).center, size, "*")
+        zfill = timed(bytestr(b"-" + key).zfill, size)
+        padded = bytestr(key).center(size, " ")
+        strip = timed(padded.strip, " ")
+        legacy = (timed(legacy_center, bytestr(key), size, "*")
+                  if size <= legacy_max_size // 32 else None)
+        rows.append((fmt_size(size),
+                     *(f"{cell * 1e3:,.3f} ms" for cell in (center, zfill, strip)),
+                     f"{legacy * 1e3:,.2f} ms" if legacy else "skipped"))
+    report(f"pad a {key_size} B key to width", ("width", "center", "zfill", "strip", "legacy center"), rows)
+
+
+BENCHMARKS = {
+    "wipe": bench_wipe,
+    "concat": bench_concat,
+    "growth": bench_growth,
+    "locked": bench_locked,
+    "pool": bench_pool,
+    "view": bench_view,
+    "isplit": bench_isplit,
+    "replace": bench_replace,
+    "case": bench_case,
+    "pad": bench_pad,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--max-size", type=int, default=SIZES[-1])
+    parser.add_argument("--legacy-max-size", type=int, default=32 * 2**20,
+                        help="largest size to run the slow legacy implementations on")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args.max_size, args.legacy_max_size)
@@ -0,0 +1,396 @@
+"""Benchmarks for cryptdict.py
+
+Usage: python bench_cryptdict.py [benchmark ...] [--max-size BYTES] [--legacy-max-size BYTES]
+"""
+from argparse import ArgumentParser
+import asyncio
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from os import fdopen, pipe, stat, urandom
+from os.path import abspath, dirname
+from statistics import quantiles
+from subprocess import run
+import sys
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from threading import Thread
+from time import perf_counter, sleep
+
+from bench_bytestr import SIZES, fmt_size, report, timed
+from bytestr import bytestr
+from bytestrgpg import BytestrGPG
+from cryptdict import AsyncCryptdict, Cryptdict
+import gnupg
+from gnupg import GPG, default_buffer_size
+from kdf import KDF_PROFILES, KDFS, time_kdf
+
+
+class Result(object):
+    """Stand-in for the gnupg result objects the readers fill in"""
+
+
+def feed_pipe(data):
+    # Returns the read end of a pipe that a thread is writing data into
+    read_fd, write_fd = pipe()
+
+    def write():
+        with fdopen(write_fd, "wb") as stream:
+            stream.write(data)
+
+    writer = Thread(target=write, daemon=True)
+    writer.start()
+    return fdopen(read_fd, "rb"), writer
+
+
+def timed_read(read_data, data, size_hint=0):
+    stream, writer = feed_pipe(data)
+    result = Result()
+    result.size_hint = size_hint
+    with stream:
+        elapsed = timed(read_data, stream, result)
+    writer.join()
+    assert result.data == data
+    if isinstance(result.data, bytestr):
+        result.data.clearmem()
+    return elapsed
+
+
+####LEGACY IMPLEMENTATIONS####
+def legacy_read_data(stream, result, on_data=None):
+    # BytestrGPG._read_data before readinto: one read and one append per byte
+    result.data = bytestr()
+    data = stream.read(1)
+    while data:
+        result.data += data
+        data = stream.read(1)
+
+
+####BENCHMARKS####
+def bench_read(max_size, legacy_max_size):
+    """Throughput of reading GPG's stdout into the result from a pipe"""
+    gpg = BytestrGPG()
+    readers = (
+        ("readinto", gpg._read_data, False),
+        ("readinto+hint", gpg._read_data, True),
+        ("stock gnupg", lambda stream, result: GPG._read_data(gpg, stream, result), False),
+    )
+    rows = []
+    for size in (s for s in SIZES if s <= max_size):
+        data = urandom(size)
+        mb = size / 2**20
+        cells = [f"{mb / timed_read(read_data, data, size if hint else 0):,.0f} MB/s"
+                 for _, read_data, hint in readers]
+        legacy = timed_read(legacy_read_data, data) if size <= legacy_max_size else None
+        cells.append(f"{mb / legacy:,.2f} MB/s" if legacy else "skipped")
+        rows.append((fmt_size(size), *cells))
+    report("read GPG output from a pipe", ("size", *(name for name, _, _ in readers), "1 byte reads"), rows)
+
+
+def bench_latency(max_size, legacy_max_size, item_size=1024, count=100, pause=0.02):
+    """Encrypt and decrypt latency of small items with and without the gpg process pool.
+    gpg's iterated S2K is turned off so key stretching does not hide the process overhead, and
+    calls are spaced out by pause seconds the way interactive use would be"""
+    data = urandom(item_size)
+    rows = []
+    for pool_size in (0, 1, 2):
+        gpg = BytestrGPG(pool_size=pool_size)
+        encrypt, decrypt = [], []
+        encrypt_item = lambda: gpg.encrypt(data, None, symmetric="AES256", passphrase="bench",
+                                           extra_args=["--s2k-mode", "1"])
+        for _ in range(count):
+            sleep(pause)
+            encrypt.append(timed(encrypt_item))
+            ciphertext = encrypt_item().data
+            sleep(pause)
+            decrypt.append(timed(lambda: gpg.decrypt(ciphertext, passphrase="bench")))
+        if gpg.process_pool is not None:
+            gpg.process_pool.close()
+
+        cells = []
+        for samples in (encrypt, decrypt):
+            percentiles = quantiles(samples, n=100)
+            cells.extend(f"{percentiles[i] * 1e3:,.1f} ms" for i in (49, 98))
+        rows.append(("off" if not pool_size else pool_size, *cells))
+    report(f"{fmt_size(item_size)} item latency over {count} calls",
+           ("pool size", "encrypt p50", "encrypt p99", "decrypt p50", "decrypt p99"), rows)
+
+
+def timed_load(items, batched, gpg_extra_args=Cryptdict.GPG_EXTRA_ARGS):
+    # Loads items into a fresh Cryptdict, Cryptdict prints as it goes so stdout is dropped
+    with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+        cryptdict = Cryptdict("bench", path + "/")
+        cryptdict.GPG_EXTRA_ARGS = gpg_extra_args
+        if batched:
+            elapsed = timed(cryptdict.setmany, items)
+        else:
+            elapsed = timed(lambda: [cryptdict.__setitem__(k, v) for k, v in items.items()])
+        # __del__ wipes the keys and removes the files
+        del cryptdict
+    return elapsed
+
+
+def bench_batch(max_size, legacy_max_size, batch_sizes=(1, 10, 100, 1000), legacy_max_items=10):
+    """Items per second when bulk loading a Cryptdict one item at a time vs with setmany"""
+    # Start the shared gpg process pool so the first row does not pay for it
+    timed_load({"warm up": "warm up"}, True)
+    rows = []
+    for count in batch_sizes:
+        items = {f"item {i}": urandom(32).hex() for i in range(count)}
+        cells = [count / timed_load(items, batched) for batched in (True, False)]
+        legacy = timed_load(items, False, ()) if count <= legacy_max_items else None
+        rows.append((count, *(f"{cell:,.1f} /s" for cell in cells),
+                     f"{count / legacy:,.1f} /s" if legacy else "skipped"))
+    report("bulk load 64 B items into a Cryptdict",
+           ("batch size", "setmany", "one by one", "old gpg args"), rows)
+
+
+def bench_getmany(max_size, legacy_max_size, item_size=1024, count=64, worker_counts=(1, 2, 4, 8, 16, 32)):
+    """Items per second when decrypting a batch with getmany as the worker count grows"""
+    items = {f"item {i}": urandom(item_size // 2).hex() for i in range(count)}
+    with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+        cryptdict = Cryptdict("bench", path + "/", from_dict=items)
+        one_by_one = timed(lambda: [cryptdict[k].clearmem() for k in items])
+        elapsed = [timed(lambda: [data.clearmem() for _, data in cryptdict.getmany(list(items), workers)])
+                   for workers in worker_counts]
+        del cryptdict
+    rows = [("__getitem__", f"{count / one_by_one:,.1f} /s", "1.00x")]
+    rows.extend((workers, f"{count / cell:,.1f} /s", f"{one_by_one / cell:,.2f}x")
+                for workers, cell in zip(worker_counts, elapsed))
+    report(f"decrypt {count} items of {fmt_size(item_size)}", ("workers", "items", "speedup"), rows)
+
+
+def bench_key_cache(max_size, legacy_max_size, count=1000):
+    """Cost of reading scrypt_key, e.g. once per keystroke in the demo, with and without the key cache"""
+    rows = []
+    for label, max_uses in (("cached", None), ("derive every time", 1)):
+        with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+            cryptdict = Cryptdict("bench", path + "/", key_max_uses=max_uses)
+            elapsed = timed(lambda: [cryptdict.scrypt_key.destroy() for _ in range(count)])
+            stats = cryptdict.key_cache.stats
+            del cryptdict
+        rows.append((label, f"{elapsed / count * 1e6:,.1f} us", stats["hits"], stats["misses"]))
+    report(f"{count} reads of scrypt_key", ("", "per read", "hits", "misses"), rows)
+
+
+def bench_kdf(max_size, legacy_max_size, rounds=3):
+    """Time per key derivation for every KDF of every profile that is available here"""
+    rows = []
+    for profile, choices in KDF_PROFILES.items():
+        for name, params in choices:
+            if KDFS[name] is None:
+                rows.append((profile, name, "unavailable"))
+                continue
+            seconds = min(time_kdf(name, params) for _ in range(rounds))
+            rows.append((profile, name, f"{seconds * 1e3:,.1f} ms"))
+    report("key derivation", ("profile", "kdf", "per key"), rows)
+
+
+def bench_async(max_size, legacy_max_size, count=256, limits=(1, 16, 64, 256)):
+    """Operations per second on one event loop, AsyncCryptdict with growing
+    concurrency limits vs the blocking Cryptdict wrapped in run_in_executor"""
+    items = {f"item {i}": urandom(32).hex() for i in range(count)}
+
+    async def executor_ops(cryptdict):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, cryptdict.__setitem__, k, v)
+                               for k, v in items.items()))
+        start = perf_counter()
+        results = await asyncio.gather(*(loop.run_in_executor(None, cryptdict.__getitem__, k)
+                                         for k in items))
+        return perf_counter() - start, results
+
+    async def async_ops(cryptdict):
+        await asyncio.gather(*(cryptdict.set(k, v) for k, v in items.items()))
+        start = perf_counter()
+        results = await asyncio.gather(*(cryptdict.get(k) for k in items))
+        return perf_counter() - start, results
+
+    def run(cryptdict_type, ops, **kwargs):
+        with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+            cryptdict = cryptdict_type("bench", path + "/", **kwargs)
+            start = perf_counter()
+            get_elapsed, results = asyncio.run(ops(cryptdict))
+            set_elapsed = perf_counter() - start - get_elapsed
+            for data in results:
+                data.clearmem()
+            del cryptdict, results
+        return f"{count / set_elapsed:,.1f} /s", f"{count / get_elapsed:,.1f} /s"
+
+    rows = [("run_in_executor", *run(Cryptdict, executor_ops))]
+    rows.extend((f"async, limit {limit}", *run(AsyncCryptdict, async_ops, max_concurrency=limit))
+                for limit in limits)
+    report(f"{count} sets then {count} gets of 64 B items on one event loop", ("", "set", "get"), rows)
+
+
+def bench_io_mode(max_size, legacy_max_size, item_size=1024, count=200):
+    """gpg calls per second for small items and decrypt throughput for large ones, with
+    helper threads per call vs a selector on the calling thread"""
+    small = urandom(item_size)
+    large = urandom(max_size)
+    rows = []
+    for io_mode in ("threads", "select"):
+        gpg = BytestrGPG(io_mode=io_mode)
+        encrypt = lambda data: gpg.encrypt(data, None, symmetric="AES256", passphrase="bench",
+                                           armor=False, extra_args=["--s2k-mode", "1"]).data
+        ciphertext = encrypt(small)
+        calls = timed(lambda: [gpg.decrypt(ciphertext, passphrase="bench").data.clearmem()
+                               for _ in range(count)])
+        ciphertext = encrypt(large)
+        elapsed = timed(lambda: gpg.decrypt(ciphertext, passphrase="bench").data.clearmem())
+        gpg.process_pool.close()
+        rows.append((io_mode, f"{count / calls:,.1f} /s", f"{max_size / 2**20 / elapsed:,.0f} MB/s"))
+    report("gpg I/O mode", ("io_mode", f"{fmt_size(item_size)} decrypts",
+                            f"{fmt_size(max_size)} decrypt"), rows)
+
+
+def bench_buffer(max_size, legacy_max_size, buffer_sizes=(1024, 1 << 14, None)):
+    """Throughput of encrypting a large input by gpg buffer size, from a regular file
+    (sent with sendfile) and from an in-memory stream (read into a reused buffer)"""
+    data = urandom(max_size)
+    mb = max_size / 2**20
+    rows = []
+    with NamedTemporaryFile() as file:
+        file.write(data)
+        file.flush()
+        for buffer_size in buffer_sizes:
+            cells = []
+            for io_mode in ("threads", "select"):
+                gpg = BytestrGPG(pool_size=0, io_mode=io_mode, buffer_size=buffer_size)
+                # No compression, so the run measures moving data rather than zlib
+                encrypt = lambda stream: gpg.encrypt_file(stream, None, symmetric="AES256", passphrase="bench",
+                                                          armor=False, extra_args=["--s2k-mode", "1", "-z", "0"])
+                for source in (lambda: open(file.name, "rb"), lambda: BytesIO(data)):
+                    with source() as stream:
+                        elapsed = timed(lambda: encrypt(stream).data.clearmem())
+                    cells.append(f"{mb / elapsed:,.0f} MB/s")
+            rows.append((fmt_size(buffer_size or default_buffer_size()), *cells))
+    report(f"encrypt {fmt_size(max_size)}", ("buffer size", "threads file", "threads stream",
+                                             "select file", "select stream"), rows)
+
+
+# Runs in a fresh interpreter so each way of storing an item gets its own peak RSS
+STREAM_CHILD = """
+import resource, sys
+from contextlib import redirect_stdout
+from io import StringIO
+from os import urandom
+from tempfile import TemporaryDirectory
+from bytestr import bytestr
+from cryptdict import Cryptdict
+
+size, how = int(sys.argv[1]), sys.argv[2]
+chunks = (urandom(1 << 16) for _ in range(size >> 16))
+with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+    cryptdict = Cryptdict("bench", path + "/")
+    cryptdict.scrypt_key.destroy()
+    if how != "stream":
+        # Filled in place so building it peaks at its own size
+        data = bytestr()
+        data._make_room(0, size)
+        with memoryview(data) as view:
+            for offset in range(0, size, 1 << 16):
+                view[offset:offset + (1 << 16)] = next(chunks)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if how == "stream":
+        cryptdict.set_stream("item", chunks)
+    else:
+        if how == "bytestr":
+            cryptdict["item"] = data
+        else:
+            # Cryptdict.__setitem__ before set_stream: a BytesIO copy via bytestr.IO
+            result = cryptdict.gpg.encrypt_file(data.IO, None, symmetric=cryptdict.cipher,
+                                                passphrase=cryptdict.scrypt_key,
+                                                extra_args=list(cryptdict.GPG_EXTRA_ARGS))
+            result.data.clearmem()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    del cryptdict
+print(peak - baseline)
+"""
+
+
+def stream_peak_rss(size, how):
+    # Peak RSS growth in bytes of a child process that stores one item of size bytes
+    child = run([sys.executable, "-c", STREAM_CHILD, str(size), how], capture_output=True, check=True,
+                cwd=dirname(abspath(__file__)), text=True)
+    return int(child.stdout.split()[-1]) * 1024
+
+
+def bench_stream(max_size, legacy_max_size, sizes=(1 << 20, 1 << 24, 1 << 26, 1 << 28)):
+    """Peak memory of storing one large item on top of the plaintext: set_stream from 64 KB chunks,
+    __setitem__ with a bytestr and the old __setitem__ that copied the bytestr into a BytesIO,
+    each in its own process"""
+    rows = []
+    for size in sizes:
+        rows.append((fmt_size(size), *(fmt_size(stream_peak_rss(size, how))
+                                       for how in ("stream", "bytestr", "legacy"))))
+    report("peak RSS growth storing one item", ("size", "set_stream", "__setitem__", "old __setitem__"), rows)
+
+
+def bench_storage(max_size, legacy_max_size, count=50):
+    """Disk bytes and items per second for each armor and compression policy, over
+    an even mix of 64 B hex secrets, 4 KB of text and 4 KB of random bytes"""
+    text = " ".join(f"line {i} of some configuration text" for i in range(120))[:4096]
+    kinds = (lambda: urandom(32).hex(), lambda: text, lambda: bytestr(urandom(4096)))
+    items = {f"item {i}": kinds[i % len(kinds)] for i in range(count * len(kinds))}
+    rows = []
+    for armor in (True, False):
+        for compression in Cryptdict.COMPRESSION_MODES:
+            with TemporaryDirectory() as path, redirect_stdout(StringIO()):
+                cryptdict = Cryptdict("bench", path + "/", armor=armor, compression=compression)
+                set_elapsed = timed(lambda: [cryptdict.__setitem__(k, make()) for k, make in items.items()])
+                disk = sum(stat(item_path).st_size for item_path in cryptdict.values())
+                get_elapsed = timed(lambda: [cryptdict[k].clearmem() for k in items])
+                del cryptdict
+            rows.append(("armor" if armor else "binary", compression, fmt_size(disk),
+                         f"{len(items) / set_elapsed:,.1f} /s", f"{len(items) / get_elapsed:,.1f} /s"))
+    report(f"storage policies, {len(items)} items", ("format", "compression", "on disk", "set", "get"), rows)
+
+
+def bench_probe(max_size, legacy_max_size, count=50):
+    """Cost of creating a GPG instance and reading its version: probing gpg for every
+    instance as GPG.__init__ used to, the in-process memo and the on-disk cache"""
+    def per_instance(clear_memo, cache_file=None):
+        def create():
+            if clear_memo:
+                gnupg._capabilities.clear()
+            return GPG(capability_cache_file=cache_file).version
+        create()
+        return timed(lambda: [create() for _ in range(count)]) / count
+
+    with TemporaryDirectory() as path:
+        rows = [("probe every time", per_instance(True)),
+                ("memoized", per_instance(False)),
+                ("cache file", per_instance(True, path + "/capabilities.json"))]
+    report(f"{count} GPG instances", ("", "per instance"),
+           [(label, f"{elapsed * 1e3:,.3f} ms") for label, elapsed in rows])
+
+
+BENCHMARKS = {
+    "read": bench_read,
+    "latency": bench_latency,
+    "batch": bench_batch,
+    "getmany": bench_getmany,
+    "key_cache": bench_key_cache,
+    "kdf": bench_kdf,
+    "async": bench_async,
+    "io_mode": bench_io_mode,
+    "buffer": bench_buffer,
+    "stream": bench_stream,
+    "storage": bench_storage,
+    "probe": bench_probe,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--max-size", type=int, default=SIZES[3])
+    parser.add_argument("--legacy-max-size", type=int, default=SIZES[1],
+                        help="largest size to run the slow legacy implementations on")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args.max_size, args.legacy_max_size)
@@ -0,0 +1,132 @@
+"""Benchmarks for demo_app.py, these need Gtk and a display
+
+Usage: python bench_demo.py [benchmark ...] [--max-items N]
+"""
+from argparse import ArgumentParser
+from re import finditer
+from time import perf_counter
+
+from gi.repository import Gtk
+
+from bench_bytestr import report, timed
+from bytestr import bytestr
+import demo_app
+from demo_app import SecureEntryDemo, build_and_connect, glade_template
+
+
+class Handlers(object):
+    """Stands in for the widget classes, every signal handler does nothing"""
+
+    def __getattr__(self, name):
+        if name.startswith("on_"):
+            return lambda *args: None
+        raise AttributeError(name)
+
+
+####LEGACY IMPLEMENTATIONS####
+def legacy_build_and_connect(widget, filename):
+    # build_and_connect before GladeTemplate: reads and scans the file for every widget
+    with open(f"ui/{filename}.glade", "r+") as glade_file:
+        glade_xml = glade_file.read()
+        builder = Gtk.Builder().new_from_string(glade_xml, len(glade_xml))
+        builder.connect_signals(widget)
+    id_iter = (m[1] for m in finditer(r"id=\"([\w\d]+)\"", glade_xml))
+    widget.__dict__.update({obj_id: builder.get_object(obj_id) for obj_id in id_iter})
+
+
+def legacy_render(output_buffer, decrypted_data):
+    # do_decrypt_item before do_render_output: looks up an iter for every byte
+    output_buffer.set_text("", 0)
+    for pos, byte in enumerate(decrypted_data):
+        cursor = output_buffer.get_iter_at_offset(pos)
+        output_buffer.insert(cursor, chr(byte), 1)
+    decrypted_data.clearmem()
+
+
+####BENCHMARKS####
+def timed_widgets(build, filename, count):
+    widgets = [Handlers() for _ in range(count)]
+    elapsed = timed(lambda: [build(widget, filename) for widget in widgets])
+    for widget in widgets:
+        widget.expander.destroy()
+    return elapsed
+
+
+def bench_widgets(max_items, filename="cryptdict_item"):
+    """Item widgets built per second from the cached template vs reading the .glade file each time"""
+    demo_app.glade_templates.clear()
+    rows = []
+    for count in (c for c in (100, 1000, 5000, 20000) if c <= max_items):
+        cached = timed_widgets(build_and_connect, filename, count)
+        legacy = timed_widgets(legacy_build_and_connect, filename, count)
+        rows.append((count, f"{count / cached:,.0f} /s", f"{count / legacy:,.0f} /s", f"{legacy / cached:,.2f}x"))
+    report(f"{filename} widgets", ("widgets", "cached", "read each time", "speedup"), rows)
+
+
+def bench_load(max_items, filename="cryptdict_item", count=1000):
+    """Cost of getting a template's xml and ids without building anything"""
+    def legacy_load():
+        with open(f"ui/{filename}.glade", "r+") as glade_file:
+            glade_xml = glade_file.read()
+        return glade_xml, [m[1] for m in finditer(r"id=\"([\w\d]+)\"", glade_xml)]
+
+    demo_app.glade_templates.clear()
+    cached = timed(lambda: [glade_template(filename) for _ in range(count)])
+    legacy = timed(lambda: [legacy_load() for _ in range(count)])
+    report(f"{count} loads of {filename}", ("", "per load"),
+           [("cached", f"{cached / count * 1e6:,.2f} us"), ("read each time", f"{legacy / count * 1e6:,.2f} us")])
+
+
+def bench_render(max_items, sizes=(1 << 10, 10 << 10, 100 << 10, 1 << 20), max_legacy_size=32 << 10):
+    """Time to render decrypted items into the output buffer and the longest
+    the main loop is kept busy at once"""
+    app = SecureEntryDemo()
+    app.output_buffer = Gtk.TextBuffer()
+    rows = []
+    for size in sizes:
+        data = bytestr(bytes(range(256)) * (size // 256))
+        app.output_buffer.set_text("", 0)
+        steps = []
+        start = perf_counter()
+        # The steps do_render_output leaves to idle callbacks, run back to back
+        render = app._render_steps(data)
+        while True:
+            step_start = perf_counter()
+            more = next(render, False)
+            steps.append(perf_counter() - step_start)
+            if not more:
+                break
+        chunked = perf_counter() - start
+        assert app.output_buffer.get_char_count() == size
+
+        if size <= max_legacy_size:
+            data = bytestr(bytes(range(256)) * (size // 256))
+            legacy = timed(lambda: legacy_render(app.output_buffer, data))
+            legacy_cells = (f"{legacy * 1e3:,.1f} ms", f"{legacy / chunked:,.1f}x")
+        else:
+            legacy_cells = ("skipped", "")
+        rows.append((f"{size >> 10} KB", f"{chunked * 1e3:,.1f} ms", f"{max(steps) * 1e3:,.2f} ms",
+                     *legacy_cells))
+    report(f"render in {SecureEntryDemo.RENDER_CHUNK_SIZE} byte chunks",
+           ("item", "chunked", "longest step", "per byte", "speedup"), rows)
+
+
+BENCHMARKS = {
+    "widgets": bench_widgets,
+    "load": bench_load,
+    "render": bench_render,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--max-items", type=int, default=5000, help="most widgets to build in one run")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args.max_items)
@@ -0,0 +1,90 @@
+"""Import time budgets for the modules that tools import
+
+Usage: python bench_imports.py [module ...] [--runs N]
+
+Each module is imported in a fresh interpreter under -X importtime and the
+fastest run is checked against its budget. The exit status is 1 if any module
+is over budget or loads a module it must leave for first use.
+"""
+from argparse import ArgumentParser
+import os
+from os.path import abspath, dirname
+from re import compile as re_compile
+from subprocess import run
+import sys
+
+from bench_bytestr import report
+
+
+# module: (most milliseconds, modules it must not load)
+BUDGETS = {
+    "bytestr": (20, ("re", "secrets", "gnupg")),
+    "securemem": (25, ("re", "secrets", "gnupg")),
+    "kdf": (15, ("argparse", "re")),
+    "cryptdict": (40, ("gnupg", "bytestrgpg", "asyncio", "concurrent.futures", "sh", "pprint",
+                       "argparse", "secrets")),
+    "demo_app": (400, ("gnupg", "bytestrgpg", "asyncio", "sh")),
+}
+
+IMPORT_TIME_LINE = re_compile(r"import time:\s*(?P<self>\d+) \|\s*(?P<cumulative>\d+) \|(?P<name> .*)$")
+
+
+def import_times(module):
+    # {name: (depth, cumulative microseconds)} for every module a fresh interpreter loads to import module
+    env = dict(os.environ)
+    # Bytecode has to be cached or every run pays for compiling the module
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    child = run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                capture_output=True, text=True, env=env, cwd=dirname(abspath(__file__)))
+    if child.returncode:
+        raise ImportError(child.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in child.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            name = match["name"].lstrip()
+            depth = (len(match["name"]) - len(name) - 1) // 2
+            times[name] = depth, int(match["cumulative"])
+    return times
+
+
+def check(module, runs):
+    """Returns the report row for module and a list of its problems"""
+    budget, forbidden = BUDGETS[module]
+    try:
+        # Warm up so the module's bytecode is cached
+        import_times(module)
+        samples = [import_times(module) for _ in range(runs)]
+    except ImportError as e:
+        print(f"{module}: skipped, {e}")
+        return (module, "skipped", f"{budget} ms", "", "", "skipped"), []
+
+    elapsed = min(sample[module][1] for sample in samples) / 1e3
+    times = samples[0]
+    direct = [name for name, (depth, _) in times.items() if depth == 1]
+    slowest = max(direct, key=lambda name: times[name][1], default="")
+    loaded = [name for name in forbidden if name in times]
+    problems = ([f"over by {elapsed - budget:,.1f} ms"] if elapsed > budget else []) + \
+        ([f"loads {', '.join(loaded)}"] if loaded else [])
+    row = (module, f"{elapsed:,.1f} ms", f"{budget} ms", slowest,
+           f"{times[slowest][1] / 1e3:,.1f} ms" if slowest else "", "FAIL" if problems else "ok")
+    return row, problems
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", metavar="module",
+                        help=f"any of: {', '.join(BUDGETS)} (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="imports per module, the fastest counts")
+    args = parser.parse_args()
+    for name in args.modules:
+        if name not in BUDGETS:
+            parser.error(f"unknown module {name!r}")
+
+    results = [check(module, args.runs) for module in args.modules or BUDGETS]
+    report("import time", ("module", "import", "budget", "slowest import", "", "status"),
+           [row for row, _ in results])
+    for (module, *_), problems in results:
+        for problem in problems:
+            print(f"{module}: {problem}")
+    sys.exit(1 if any(problems for _, problems in results) else 0)
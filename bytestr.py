@@ -1,5 +1,12 @@
-from secrets import randbelow
 from io import BytesIO
+from os import urandom
+from collections import defaultdict
+from threading import Lock
+
+try:
+    import ctypes
+except ImportError:  # pragma: no cover
+    ctypes = None
 
 
 class bytestr(bytearray):
@@ -14,19 +21,73 @@ class bytestr(bytearray):
         ("with_context", False)
     )
 
+    # Bulk fills are done in chunks of this size when memset is unavailable
+    # and for random fills so no large temporary object is ever allocated
+    WIPE_CHUNK_SIZE = 1 << 16
+
 ####STATIC METHODS####
     @staticmethod
     def destroy(byteslike_obj, clearmem=True, randomize=False):
         if hasattr(byteslike_obj, "clear"):
             if randomize:
-                bytestr.set_all(byteslike_obj, randbelow, 256)
+                bytestr.fill_random(byteslike_obj)
             if clearmem or type(byteslike_obj) is bytearray:
-                bytestr.set_all(byteslike_obj, 0)
+                bytestr.fill(byteslike_obj, 0)
             byteslike_obj.clear()
         del byteslike_obj
 
+    @staticmethod
+    def fill(byteslike_obj, value=0):
+        """Sets every byte of byteslike_obj to value in one pass over its buffer
+        without creating a copy of the existing contents"""
+        try:
+            view = memoryview(byteslike_obj)
+        except TypeError:
+            # Not a buffer (e.g. a list of ints) so fall back to item assignment
+            for i in range(len(byteslike_obj)):
+                byteslike_obj[i] = value
+            return
+
+        with view:
+            if view.readonly:
+                raise TypeError(f"cannot fill read-only {type(byteslike_obj).__name__}")
+            if not view.nbytes:
+                return
+            if not view.c_contiguous:
+                for i in range(len(view)):
+                    view[i] = value
+                return
+            if ctypes is not None:
+                # Export is released before the view so resizing still works after
+                buffer = ctypes.c_char.from_buffer(view)
+                ctypes.memset(ctypes.addressof(buffer), value, view.nbytes)
+                del buffer
+                return
+            with view.cast("B") as byte_view:
+                chunk = bytes((value,)) * min(len(byte_view), bytestr.WIPE_CHUNK_SIZE)
+                for start in range(0, len(byte_view), len(chunk)):
+                    stop = min(start + len(chunk), len(byte_view))
+                    byte_view[start:stop] = chunk[:stop - start]
+
+    @staticmethod
+    def fill_random(byteslike_obj):
+        """Overwrites every byte of byteslike_obj with random data from os.urandom
+        one chunk at a time"""
+        try:
+            view = memoryview(byteslike_obj)
+        except TypeError:
+            from secrets import randbelow
+            return bytestr.set_all(byteslike_obj, randbelow, 256)
+
+        with view, view.cast("B") as byte_view:
+            for start in range(0, len(byte_view), bytestr.WIPE_CHUNK_SIZE):
+                stop = min(start + bytestr.WIPE_CHUNK_SIZE, len(byte_view))
+                byte_view[start:stop] = urandom(stop - start)
+
     @staticmethod
     def set_all(byteslike_obj, int_func, *args, set_by_index=False):
+        if not callable(int_func) and not set_by_index:
+            return bytestr.fill(byteslike_obj, int_func)
         for i in range(len(byteslike_obj)):
             if set_by_index:
                 byteslike_obj[i] = int_func(i, *args)
@@ -56,6 +117,19 @@ class bytestr(bytearray):
             print("Failed to parse ", arg)
             raise TypeError
 
+    @staticmethod
+    def parse_buffer(arg):
+        # Returns bytes-like object that can be copied in one slice assignment
+        # or None if arg has to be parsed one int at a time
+        if isinstance(arg, (bytes, bytearray)):
+            return arg
+        if isinstance(arg, memoryview):
+            return arg if arg.format in ("B", "b", "c") else arg.cast("B")
+        if isinstance(arg, str):
+            # Same bytes as ord(char) for each char, chars above 255 raise ValueError
+            return arg.encode("latin-1")
+        return None
+
 
 ####SPECIAL METHODS####
 
@@ -68,12 +142,17 @@ class bytestr(bytearray):
                               for kwarg in self.BYTESTR_ONLY_KWARGS})
         super().__init__(*args, **kwargs)
         self.cursor = len(self)
+        # Number of times the buffer has been moved to a bigger allocation
+        self.reallocs = 0
 
         for arg in args:
             self.destroy(arg)
 
         # if self.with_context:
         self.context = []
+        # Bumped whenever the contents are cleared, views only stay valid
+        # while it matches the one they were made at
+        self.views_generation = self.__dict__.get("views_generation", -1) + 1
 
     def __del__(self):
         self.destroy(self)
@@ -106,14 +185,25 @@ class bytestr(bytearray):
         return self.__isub__(other)
 
     def __imul__(self, n):
-        before = self.copy()
-        for _ in range(n):
-            self.extend(before)
-        del before
+        if n <= 0:
+            self.clearmem()
+            return self
+        size = len(self)
+        if not size:
+            return self
+        self._make_room(size, size * (n - 1))
+        with memoryview(self) as view:
+            for start in range(size, size * n, size):
+                view[start:start + size] = view[:size]
         return self
 
     def __mul__(self, n):
-        return bytestr(self).__imul__(n)
+        result = self.pool.acquire(len(self) * max(n, 0))
+        with memoryview(result) as view:
+            for start in range(0, len(result), len(self) or 1):
+                view[start:start + len(self)] = self
+        self.destroy(self)
+        return result
 
     def __enter__(self):
         bytestr.__init__(self, with_context=True)
@@ -127,24 +217,48 @@ class bytestr(bytearray):
     def __contains__(self, item):
         return super().__contains__(bytestr.parse_arg(item))
 
+    def __delitem__(self, index):
+        # bytearray drops bytes from the front by moving its start pointer and
+        # the next resize then copies the data to a new block and frees the old
+        # one unwiped, so the rest is moved down in place instead
+        if isinstance(index, int) and len(self) and index in (0, -len(self)):
+            return self._drop_front(1)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and start == 0 and stop > 0:
+                return self._drop_front(stop)
+        super().__delitem__(index)
+
 ####MUTABLE SEQUENCE METHODS####
 
     def insert(self, index, item):
-        for i, _int in enumerate(bytestr.parse_arg(item, valid_types=(int,))):
-            super().insert(index + i, _int)
+        buf = self.parse_buffer(item)
+        # Clamp index the same way bytearray.insert does
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        if buf is None:
+            return self._splice_ints(index, bytestr.parse_arg(item, valid_types=(int,)))
+        self._splice(index, buf)
 
     def append(self, item):
-        for _int in bytestr.parse_arg(item, valid_types=(int,)):
-            super().append(_int)
+        buf = self.parse_buffer(item)
+        if buf is None:
+            return self._splice_ints(len(self), bytestr.parse_arg(item, valid_types=(int,)))
+        self._splice(len(self), buf)
 
     def extend(self, seq):
-        for item in seq:
-            self.append(item)
+        buf = self.parse_buffer(seq)
+        if buf is None:
+            for item in seq:
+                self.append(item)
+            return
+        self._splice(len(self), buf)
 
     def copy(self):
-        kwargs = {kwarg[0]: self.__dict__.get(kwarg)
+        kwargs = {kwarg[0]: self.__dict__.get(*kwarg)
                   for kwarg in self.BYTESTR_ONLY_KWARGS}
-        return bytestr(self[:], **kwargs)
+        result = self.pool.acquire(len(self), **kwargs)
+        result[:] = self
+        return result
 
 ####SUPER METHODS####
     def count(self, sub, start=None, end=None):
@@ -176,16 +290,119 @@ class bytestr(bytearray):
         return arg_lst
 
     def split(self, sep=None, maxsplit=-1):
-        return self.return_with_context(bytestr(byteslike_obj) for byteslike_obj in super().split(self.parse_arg(sep), maxsplit))
+        return self.return_with_context(self.pool.acquire_copy(byteslike_obj) for byteslike_obj in super().split(self.parse_arg(sep), maxsplit))
 
     def rsplit(self, sep=None, maxsplit=-1):
-        return self.return_with_context(bytestr(byteslike_obj) for byteslike_obj in super().rsplit(self.parse_arg(sep), maxsplit))
+        return self.return_with_context(self.pool.acquire_copy(byteslike_obj) for byteslike_obj in super().rsplit(self.parse_arg(sep), maxsplit))
 
     def partition(self, sep):
-        return self.return_with_context(bytestr(byteslike_obj) for byteslike_obj in super().partition(self.parse_arg(sep)))
+        return self.return_with_context(self.pool.acquire_copy(byteslike_obj) for byteslike_obj in super().partition(self.parse_arg(sep)))
 
     def rpartition(self, sep):
-        return self.return_with_context(bytestr(byteslike_obj) for byteslike_obj in super().rpartition(self.parse_arg(sep)))
+        return self.return_with_context(self.pool.acquire_copy(byteslike_obj) for byteslike_obj in super().rpartition(self.parse_arg(sep)))
+
+####LAZY ITERATOR METHODS####
+# Pieces are yielded one at a time as views or pooled bytestrs and are wiped
+# and given back to the pool (or invalidated) as soon as the consumer asks for
+# the next one, so copy a piece if it has to outlive the iteration
+
+    WHITESPACE_TOKEN = rb"[^ \t\n\r\x0b\x0c]+"
+
+    def isplit(self, sep=None, maxsplit=-1, as_view=False):
+        yield from self._iter_pieces(self._split_spans(sep, maxsplit), as_view)
+
+    def irsplit(self, sep=None, maxsplit=-1, as_view=False):
+        # Pieces come out in the same left to right order as rsplit
+        yield from self._iter_pieces(self._rsplit_spans(sep, maxsplit), as_view)
+
+    def ipartition(self, sep, as_view=False):
+        sep = self._parse_sep(sep)
+        index = super().find(sep)
+        if index < 0:
+            spans = ((0, len(self)), (len(self), len(self)), (len(self), len(self)))
+        else:
+            spans = ((0, index), (index, index + len(sep)), (index + len(sep), len(self)))
+        yield from self._iter_pieces(spans, as_view)
+
+    def irpartition(self, sep, as_view=False):
+        sep = self._parse_sep(sep)
+        index = super().rfind(sep)
+        if index < 0:
+            spans = ((0, 0), (0, 0), (0, len(self)))
+        else:
+            spans = ((0, index), (index, index + len(sep)), (index + len(sep), len(self)))
+        yield from self._iter_pieces(spans, as_view)
+
+    def _parse_sep(self, sep):
+        sep = self.parse_arg(sep)
+        if not sep:
+            raise ValueError("empty separator")
+        return sep
+
+    def _split_spans(self, sep, maxsplit):
+        if sep is None:
+            # re is imported where it is used so that importing bytestr stays cheap
+            from re import finditer
+            for n, match in enumerate(finditer(self.WHITESPACE_TOKEN, self)):
+                if n == maxsplit:
+                    # Remainder keeps its trailing whitespace like bytes.split
+                    yield match.start(), len(self)
+                    return
+                yield match.span()
+            return
+
+        sep = self._parse_sep(sep)
+        start = n = 0
+        while n != maxsplit:
+            index = super().find(sep, start)
+            if index < 0:
+                break
+            yield start, index
+            start = index + len(sep)
+            n += 1
+        yield start, len(self)
+
+    def _rsplit_spans(self, sep, maxsplit):
+        # Offsets are collected from the right first, only ints are kept
+        spans = []
+        if sep is None:
+            from re import finditer
+            tokens = [match.span() for match in finditer(self.WHITESPACE_TOKEN, self)]
+            if 0 <= maxsplit < len(tokens):
+                split_at = len(tokens) - maxsplit
+                # Remainder keeps its leading whitespace like bytes.rsplit
+                spans = [(0, tokens[split_at - 1][1])] + tokens[split_at:]
+            else:
+                spans = tokens
+            return spans
+
+        sep = self._parse_sep(sep)
+        stop = len(self)
+        while len(spans) != maxsplit:
+            index = super().rfind(sep, 0, stop)
+            if index < 0:
+                break
+            spans.append((index + len(sep), stop))
+            stop = index
+        spans.append((0, stop))
+        return spans[::-1]
+
+    def _iter_pieces(self, spans, as_view):
+        for start, stop in spans:
+            if as_view:
+                piece = self.view(start, stop)
+            else:
+                piece = self.pool.acquire(stop - start)
+                with memoryview(self) as view:
+                    piece[:] = view[start:stop]
+            try:
+                yield piece
+            finally:
+                if as_view:
+                    piece.invalidate()
+                else:
+                    self.pool.release(piece)
+                del piece
 
 
 ####OVERRIDDES FOR BYTEARRAY METHODS THAT DO NOT OPERATE IN PLACE####
@@ -194,101 +411,116 @@ class bytestr(bytearray):
 # it always produces a new object, even if no changes were made."
 
     def replace(self, old, new, count=None):
-        max_count = count if count and count < len(self) else self.count(old)
-        actual_count = 0
-
-        sub_index = self.find(old)
-        while sub_index >= 0 and actual_count < max_count:
-            del self[sub_index:sub_index+len(old)]
-            self.insert(sub_index, new)
-            sub_index = self.find(old)
-            actual_count += 1
+        old = self.parse_arg(old)
+        max_count = -1 if count is None or count < 0 else count
+
+        # Find every match once, then move each segment once
+        spans = []
+        start = 0
+        while len(spans) != max_count:
+            index = super().find(old, start)
+            if index < 0:
+                break
+            spans.append((index, index + len(old)))
+            start = index + (len(old) or 1)
+
+        buf = self._parse_replacement(new)
+        self._replace_spans(spans, [buf] * len(spans))
+        if buf is not new and type(buf) is bytearray:
+            self.destroy(buf)
         return self
 
     def center(self, width, fill=" "):
-        while len(self) <= width:
-            self.insert(0, fill)
-            if len(self) <= width:
-                self.append(fill)
-        return self
+        pad = max(0, width - len(self))
+        left = pad // 2 + (pad & width & 1)
+        return self._pad(left, pad - left, fill)
 
     def ljust(self, width, fill=" "):
-        while len(self) <= width:
-            self.append(fill)
-        return self
+        return self._pad(0, max(0, width - len(self)), fill)
 
     def lstrip(self, *chars):
         return self.strip(*chars, right=False)
 
     def rjust(self, width, fill=" "):
-        while len(self) <= width:
-            self.insert(0, fill)
-        return self
+        return self._pad(max(0, width - len(self)), 0, fill)
 
     def rstrip(self, *chars):
         return self.strip(*chars, left=False)
 
     def strip(self, chars="\n\t ", left=True, right=True):
-        chars = tuple(ord(char) for char in chars)
-        if left:
-            lbound = 0
-            for i in self.range():
-                if self[i] in chars:
-                    self[i] = 0
-                    lbound = i + 1
-                    continue
-                break
-            del self[:lbound]
+        chars = self.parse_buffer(chars)
+        if not chars or not len(self):
+            return self
+        from re import compile as re_compile
+        char_class = b"".join(b"\\x%02x" % char for char in chars)
+        lbound = re_compile(b"[%b]*" % char_class).match(self).end() if left else 0
+        rbound = len(self)
         if right:
-            rbound = -1
-            for i in self.range(1, 1):
-                if self[-i] in chars:
-                    self[-i] = 0
-                    rbound = -i
-                    continue
-                break
-            del self[rbound:]
-        return self
-
-    def capitalize(self):
+            # .* runs to the end and backtracks to the last byte that is kept
+            last = re_compile(b"(?s).*[^%b]" % char_class).match(self, lbound)
+            rbound = last.end() if last else lbound
+
+        # Move what is kept to the front, truncate wipes and drops the rest
+        if lbound:
+            with memoryview(self) as view:
+                view[:rbound - lbound] = view[lbound:rbound]
+        return self.truncate(rbound - lbound)
+
+    def translate(self, table, delete=b""):
+        """Maps every byte through the 256 byte table in place, chunk by chunk.
+        Bytes in delete are removed and the freed tail is wiped"""
+        size = len(self)
+        write = 0
+        for start in range(0, size, self.WIPE_CHUNK_SIZE):
+            stop = min(start + self.WIPE_CHUNK_SIZE, size)
+            chunk = self[start:stop]
+            translated = chunk.translate(table, delete)
+            self[write:write + len(translated)] = translated
+            write += len(translated)
+            self.fill(chunk, 0)
+            self.fill(translated, 0)
+        # truncate wipes the freed tail and keeps a shrinking realloc from
+        # leaving the kept bytes behind
+        return self.truncate(write)
+
+    def _translate_byte(self, index, table):
+        self[index] = table[self[index]]
+
+    def capitalize(self, mode="latin-1"):
         if len(self) > 0:
-            self[0] = ord(chr(self[0]).upper())
+            self._translate_byte(0, self.CASE_TABLES[mode, "upper"])
         return self
 
     def expandtabs(self, tabsize=8, tabchar="\t", fill=" "):
         return self.replace(tabchar, tabsize*fill)
 
-    def lower(self):
-        self.set_all(self, lambda i: ord(
-            chr(self[i]).lower()), set_by_index=True)
-        return self
+    def lower(self, mode="latin-1"):
+        return self.translate(self.CASE_TABLES[mode, "lower"])
 
-    def upper(self):
-        self.set_all(self, lambda i: ord(
-            chr(self[i]).upper()), set_by_index=True)
-        return self
+    def upper(self, mode="latin-1"):
+        return self.translate(self.CASE_TABLES[mode, "upper"])
 
-    def swapcase(self):
-        self.set_all(self, lambda i: ord(
-            chr(self[i]).swapcase()), set_by_index=True)
-        return self
+    def swapcase(self, mode="latin-1"):
+        return self.translate(self.CASE_TABLES[mode, "swapcase"])
 
-    def title(self, space_char=" "):
-        self.capitalize()
-        for i in self.range(1):
-            if self[i - 1] == ord(space_char):
-                self[i] = ord(chr(self[i]).upper())
+    def title(self, space_char=" ", mode="latin-1"):
+        table = self.CASE_TABLES[mode, "upper"]
+        self.capitalize(mode)
+        index = super().find(ord(space_char))
+        while 0 <= index < len(self) - 1:
+            self._translate_byte(index + 1, table)
+            index = super().find(ord(space_char), index + 1)
         return self
 
     def zfill(self, width):
-        i = 0
-        if self[0] in (ord("-"), ord("+")):
-            i += 1
-        while i < len(self):
-            if len(self) < width:
-                self.insert(i, ord(b"0"))
-            i += 1
-        return self
+        pad = max(0, width - len(self))
+        if pad and len(self) and self[0] in b"-+":
+            # Keep the sign in front of the zeros
+            sign = self[0]
+            self._pad(pad, 0, "0")
+            self[0], self[pad] = sign, ord("0")
+            return self
+        return self._pad(pad, 0, "0")
 
 ####OVERRIDDEN BYTEARRAY METHODS TO REPLACE STR METHODS####
     def join(self, seq):
@@ -301,11 +533,175 @@ class bytestr(bytearray):
         return self
 
     def format(self, *args):
-        for arg in args:
-            self.replace(b"{}", arg, count=1)
+        spans = []
+        index = super().find(b"{}")
+        while index >= 0 and len(spans) < len(args):
+            spans.append((index, index + 2))
+            index = super().find(b"{}", index + 2)
+
+        news = [self._parse_replacement(arg) for arg in args[:len(spans)]]
+        self._replace_spans(spans, news)
+        for arg, new in zip(args, news):
+            if new is not arg and type(new) is bytearray:
+                self.destroy(new)
         return self
 
+    def _parse_replacement(self, new):
+        # Bytes-like replacement for new. Ints are gathered into a temporary
+        # bytearray the same way insert handles them, the caller destroys it
+        if new is self:
+            return bytearray(self)
+        buf = self.parse_buffer(new)
+        return bytearray(self.parse_arg(new, valid_types=(int,))) if buf is None else buf
+
+    def _replace_spans(self, spans, news):
+        # Replaces the sorted, non overlapping (start, stop) spans with the
+        # matching buffers in news without an intermediate copy of self. Each
+        # segment is moved once with a memmove-style slice assignment
+        deltas = [len(new) - (stop - start) for (start, stop), new in zip(spans, news)]
+        if any(delta > 0 for delta in deltas) and any(delta < 0 for delta in deltas):
+            # Mixed sizes: shrink pass with the head of every replacement,
+            # then a grow pass that inserts what is left of the longer ones
+            heads, tails, shift = [], [], 0
+            for (start, stop), new, delta in zip(spans, news, deltas):
+                head = memoryview(new)[:stop - start] if delta > 0 else new
+                heads.append(head)
+                if delta > 0:
+                    end = start + shift + len(head)
+                    tails.append(((end, end), memoryview(new)[len(head):]))
+                shift += len(head) - (stop - start)
+            self._replace_spans(spans, heads)
+            return self._replace_spans(*zip(*tails)) if tails else None
+
+        old_size = len(self)
+        growth = sum(deltas)
+        if growth > 0:
+            self._make_room(old_size, growth)
+
+        with memoryview(self) as view:
+            if growth > 0:
+                # Growing: work right to left so nothing unread is overwritten
+                shift, next_start = growth, old_size
+                for (start, stop), new, delta in reversed(tuple(zip(spans, news, deltas))):
+                    view[stop + shift:next_start + shift] = view[stop:next_start]
+                    shift -= delta
+                    view[start + shift:start + shift + len(new)] = new
+                    next_start = start
+            else:
+                # Shrinking or same size: work left to right
+                shift = 0
+                next_starts = [start for start, _ in spans[1:]] + [old_size]
+                for (start, stop), new, delta, next_start in zip(spans, news, deltas, next_starts):
+                    view[start + shift:start + shift + len(new)] = new
+                    shift += delta
+                    view[stop + shift:next_start + shift] = view[stop:next_start]
+
+        if growth < 0:
+            self.truncate(old_size + growth)
+
 ####CUSTOM METHODS####
+    @property
+    def capacity(self):
+        """Number of bytes the current buffer can hold before it is reallocated.
+        Only exact while the data starts at the front of the buffer, which is
+        why bytes are never deleted from the front in place"""
+        return max(0, bytearray.__sizeof__(self) - type(self).__basicsize__ - 1)
+
+    def truncate(self, size):
+        """Drops every byte past size after wiping it. bytearray reallocates
+        when it shrinks below half its capacity, so then the kept bytes are
+        moved to a right sized buffer and the old one is wiped first"""
+        if size >= len(self):
+            return self
+        with memoryview(self) as view:
+            self.fill(view[size:], 0)
+        if 2 * size >= self.capacity + 1:
+            del self[size:]
+            return self
+
+        # Copied through a memoryview, self[:size] would be an unwiped bytearray
+        with memoryview(self) as view, view[:size] as kept:
+            stash = bytearray(kept)
+        self.fill(self, 0)
+        bytearray.clear(self)
+        bytearray.extend(self, stash)
+        self.fill(stash, 0)
+        return self
+
+    def _drop_front(self, count):
+        # Moves everything after the first count bytes to the front, then
+        # wipes and drops the tail
+        size = len(self)
+        with memoryview(self) as view:
+            view[:size - count] = view[count:]
+        return self.truncate(size - count)
+
+    def _pad(self, left, right, fill):
+        # Grows self once to its padded size, moves the contents right by
+        # left bytes and fills both padding regions in bulk
+        fill = self._fill_byte(fill)
+        if not left and not right:
+            return self
+        size = len(self)
+        self._make_room(size, left + right)
+        with memoryview(self) as view:
+            if left:
+                view[left:left + size] = view[:size]
+                self.fill(view[:left], fill)
+            self.fill(view[left + size:], fill)
+        return self
+
+    @classmethod
+    def _fill_byte(cls, fill):
+        if isinstance(fill, int):
+            return fill
+        buf = cls.parse_buffer(fill)
+        if buf is None or len(buf) != 1:
+            raise TypeError("The fill character must be exactly one byte long")
+        return buf[0]
+
+    def _splice(self, index, buf):
+        # Copies buf into self at index with a single slice assignment
+        if buf is self:
+            buf = bytearray(self)
+            self._splice(index, buf)
+            return self.fill(buf, 0)
+
+        size = len(buf)
+        if len(self) + size <= self.capacity:
+            self[index:index] = buf
+        else:
+            self._make_room(index, size)
+            self[index:index + size] = buf
+
+    def _splice_ints(self, index, ints):
+        # Ints are gathered into a temporary buffer so growth stays on the secure path
+        buf = bytearray(ints)
+        self._splice(index, buf)
+        self.fill(buf, 0)
+
+    def _make_room(self, index, size):
+        # Opens a zeroed gap of size bytes at index. If the buffer has to grow
+        # its capacity is doubled and the contents are wiped before the realloc
+        # so the freed block never holds a stale copy of the data
+        if len(self) + size <= self.capacity:
+            self[index:index] = bytes(size)
+            return
+
+        old_size = len(self)
+        needed = old_size + size
+        stash = bytearray(self)
+        self.fill(self, 0)
+        new_capacity = max(needed, 2 * self.capacity)
+        bytearray.extend(self, bytes(new_capacity - old_size))
+        self.reallocs += 1
+        del self[needed:]
+
+        with memoryview(self) as dst, memoryview(stash) as src:
+            dst[:index] = src[:index]
+            dst[index + size:] = src[index:]
+        self.fill(stash, 0)
+
     def range(self, start=0, stop=0):
         yield from range(start, len(self)+stop)
 
@@ -313,13 +709,26 @@ class bytestr(bytearray):
         self.destroy(byteslike_obj, clearmem=self.clearmem_on_destroy,
                      randomize=self.randomize_on_destroy)
 
+    def view(self, start=0, stop=None):
+        """Returns a bytestrview over self[start:stop] that shares this buffer"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return bytestrview(self, start, max(start, stop))
+
+    def _invalidate_views(self):
+        if "views_generation" in self.__dict__:
+            self.views_generation += 1
+
+    def clear(self):
+        self._invalidate_views()
+        super().clear()
+
     def clearmem(self):
-        self.set_all(self, 0)
+        self.fill(self, 0)
         self.clear()
         self.seek(0)
 
     def randomize(self):
-        self.set_all(self, randbelow, 256)
+        self.fill_random(self)
 
     def seek(self, position):
         self.cursor = max(0, position - 1)
@@ -378,3 +787,225 @@ class bytestr(bytearray):
         print(self[:])
         print(len(self))
         print(id(self))
+
+
+def case_table(convert, mode="latin-1"):
+    """256 byte translation table applying convert to every char in mode.
+    Chars whose converted form is not a single char in mode map to themselves"""
+    limit = 128 if mode == "ascii" else 256
+    table = bytearray(range(256))
+    for i in range(limit):
+        converted = convert(chr(i))
+        if len(converted) == 1 and ord(converted) < limit:
+            table[i] = ord(converted)
+    return bytes(table)
+
+
+bytestr.CASE_TABLES = {(mode, name): case_table(convert, mode)
+                       for mode in ("ascii", "latin-1")
+                       for name, convert in (("lower", str.lower),
+                                             ("upper", str.upper),
+                                             ("swapcase", str.swapcase))}
+
+
+class bytestrview(object):
+    """Read-only window over part of a bytestr. Nothing is copied and the view
+    is invalidated when its parent is cleared"""
+    __slots__ = ("parent", "start", "stop", "generation")
+
+    def __init__(self, parent, start, stop):
+        self.parent = parent
+        self.start = start
+        self.stop = stop
+        self.generation = parent.views_generation
+
+    def invalidate(self):
+        self.parent = None
+
+    @property
+    def valid(self):
+        return self.parent is not None and self.parent.views_generation == self.generation
+
+    def _bounds(self, start=None, end=None):
+        # Translates bounds relative to the view into bounds in the parent
+        if not self.valid:
+            raise ValueError("operation on an invalidated bytestrview")
+        start, end, _ = slice(start, end).indices(len(self))
+        return self.start + start, self.start + max(start, end)
+
+    def __len__(self):
+        if not self.valid:
+            return 0
+        return max(0, min(self.stop, len(self.parent)) - self.start)
+
+    def __repr__(self):
+        state = "" if self.valid else " invalidated"
+        return f"<bytestrview [{self.start}:{self.stop}]{state}>"
+
+    def __str__(self):
+        return "".join(chr(_int) for _int in self)
+
+    def __iter__(self):
+        start, stop = self._bounds()
+        for i in range(start, stop):
+            yield self.parent[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                raise ValueError("bytestrview slices must be contiguous")
+            start, stop = self._bounds(index.start, index.stop)
+            return self.parent.view(start, stop)
+        start, stop = self._bounds()
+        if index < 0:
+            index += stop - start
+        if not 0 <= index < stop - start:
+            raise IndexError("bytestrview index out of range")
+        return self.parent[start + index]
+
+    def __contains__(self, item):
+        return self.find(item) >= 0
+
+    def __eq__(self, other):
+        buf = bytestr.parse_buffer(other.memoryview() if isinstance(other, bytestrview) else other)
+        if buf is None:
+            return NotImplemented
+        with self.memoryview() as view:
+            return view == buf
+
+    def memoryview(self):
+        """memoryview of the window. Release it promptly as the parent cannot be
+        resized while it is alive"""
+        start, stop = self._bounds()
+        with memoryview(self.parent) as view:
+            return view[start:stop]
+
+    def copy(self):
+        """Returns a pooled bytestr holding a copy of the window"""
+        result = bytestr.pool.acquire(len(self))
+        with self.memoryview() as view:
+            result[:] = view
+        return result
+
+    def count(self, sub, start=None, end=None):
+        return bytearray.count(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end))
+
+    def find(self, sub, start=None, end=None):
+        index = bytearray.find(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end))
+        return index - self.start if index >= 0 else -1
+
+    def rfind(self, sub, start=None, end=None):
+        index = bytearray.rfind(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end))
+        return index - self.start if index >= 0 else -1
+
+    def index(self, sub, start=None, end=None):
+        return bytearray.index(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end)) - self.start
+
+    def startswith(self, sub, start=None, end=None):
+        return bytearray.startswith(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end))
+
+    def endswith(self, sub, start=None, end=None):
+        return bytearray.endswith(self.parent, bytestr.parse_arg(sub), *self._bounds(start, end))
+
+    def streaminto(self, fn, format_fn=chr):
+        for _int in self:
+            fn(format_fn(_int))
+
+
+class BytestrPool(object):
+    """Free list of pre-wiped bytestr buffers bucketed by power of two size class.
+    Buffers are wiped once when released and handed out again by acquire.
+    Whoever acquires a buffer owns it and releases it exactly once, after
+    which nothing may use it"""
+
+    def __init__(self, max_bytes_per_class=1 << 20):
+        self.max_bytes_per_class = max_bytes_per_class
+        self.free_bytestrs = defaultdict(list)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def size_class(size):
+        return 1 << (max(size, 1) - 1).bit_length()
+
+    @property
+    def stats(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pooled_bytes": sum(size * len(free) for size, free in self.free_bytestrs.items())}
+
+    def acquire(self, size=0, **kwargs):
+        """Returns a zeroed bytestr of length size"""
+        size_class = self.size_class(size)
+        with self.lock:
+            free = self.free_bytestrs.get(size_class)
+            result = free.pop() if free else None
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if result is None:
+            result = bytestr(**kwargs)
+            bytearray.extend(result, bytes(size_class))
+        else:
+            # bytestr.__init__ would free the buffer so only reset the attributes
+            result.__dict__.update({kwarg[0]: kwargs.get(*kwarg)
+                                    for kwarg in bytestr.BYTESTR_ONLY_KWARGS})
+            result.context = []
+            result.reallocs = 0
+        # Only buffers marked as handed out by this pool are taken back
+        result.leased_from = self
+        # Same size class so the length never drops below half the capacity
+        # and truncating keeps the allocation
+        del result[size:]
+        result.cursor = size
+        return result
+
+    def acquire_copy(self, byteslike_obj=b"", **kwargs):
+        """Returns a pooled bytestr holding a copy of byteslike_obj then destroys byteslike_obj"""
+        if isinstance(byteslike_obj, str):
+            buf = byteslike_obj.encode(kwargs.pop("encoding", "utf-8"))
+        else:
+            buf = bytestr.parse_buffer(byteslike_obj)
+        result = self.acquire(len(buf), **kwargs)
+        result[:] = buf
+        bytestr.destroy(byteslike_obj)
+        return result
+
+    def release(self, bytestr_obj):
+        """Wipes bytestr_obj and keeps it for reuse if it came from acquire and
+        has not been released since. Any other buffer is only wiped"""
+        with self.lock:
+            leased = getattr(bytestr_obj, "leased_from", None) is self
+            if leased:
+                bytestr_obj.leased_from = None
+        if not leased:
+            bytestr_obj.clearmem()
+            return
+        bytestr_obj._invalidate_views()
+        bytestr.fill(bytestr_obj, 0)
+
+        # Largest size class that fits without reallocating
+        capacity = bytestr_obj.capacity
+        size_class = 1 << (capacity.bit_length() - 1) if capacity else 0
+        if len(bytestr_obj) < size_class:
+            bytearray.extend(bytestr_obj, bytes(size_class - len(bytestr_obj)))
+        else:
+            del bytestr_obj[size_class:]
+
+        with self.lock:
+            free = self.free_bytestrs[size_class]
+            evicted = not size_class or (len(free) + 1) * size_class > self.max_bytes_per_class
+            if evicted:
+                self.evictions += 1
+            else:
+                free.append(bytestr_obj)
+        if evicted:
+            bytestr_obj.clear()
+
+
+bytestr.pool = BytestrPool()
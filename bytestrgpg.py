@@ -0,0 +1,98 @@
+from os import stat, fstat
+from threading import local
+
+from bytestr import bytestr
+from gnupg import GPG
+
+
+class BytestrGPG(GPG):
+    """GPG but all data read into bytestr so it can be cleared from RAM
+    Also provides a kill agent method to reset password requirement.
+    """
+    def __init__(self, pool_size=2, pool_workers=8, io_mode="threads", buffer_size=None):
+        super().__init__(gpgbinary='gpg', gnupghome=None, verbose=False,
+                 use_agent=False, keyring=None, options=None,
+                 secret_keyring=None, pool_size=pool_size, pool_workers=pool_workers,
+                 io_mode=io_mode, buffer_size=buffer_size)
+        # File object the current thread's encrypt_file call writes to
+        self.output_files = local()
+
+    def encrypt_file(self, fileobj_or_path, recipients, output=None, **kwargs):
+        """encrypt_file, but output may also be a writable binary file object.
+        gpg's stdout is then written straight into it, which unlike --output
+        leaves the command line unchanged so a pooled process can be used"""
+        if not hasattr(output, "write"):
+            return super().encrypt_file(fileobj_or_path, recipients, output=output, **kwargs)
+        self.output_files.file = output
+        try:
+            result = super().encrypt_file(fileobj_or_path, recipients, **kwargs)
+        finally:
+            self.output_files.file = None
+        if result.output_error is not None:
+            raise result.output_error
+        return result
+
+    def _handle_io(self, args, fileobj_or_path, result, passphrase=None, binary=False):
+        if "--decrypt" in args and "--output" not in args:
+            result.size_hint = self._size_hint(fileobj_or_path)
+        result.output_file = getattr(self.output_files, "file", None)
+        result.output_error = None
+        return super()._handle_io(args, fileobj_or_path, result, passphrase, binary)
+
+    @staticmethod
+    def _size_hint(fileobj_or_path):
+        # The plaintext is rarely longer than the ciphertext it came from
+        try:
+            if isinstance(fileobj_or_path, str):
+                return stat(fileobj_or_path).st_size
+            return max(0, fstat(fileobj_or_path.fileno()).st_size - fileobj_or_path.tell())
+        except (AttributeError, OSError, ValueError):
+            return 0
+
+    def _read_data(self, stream, result, on_data=None):
+        # Read the contents of the file from GPG's stdout straight into the
+        # room preallocated from the size hint. Once that is full, reads go
+        # through a small scratch buffer so the bytestr only grows if more
+        # data actually arrives, and the scratch is wiped after every copy
+        if getattr(result, "output_file", None) is not None:
+            return self._write_data(stream, result)
+        data = result.data = bytestr()
+        data._make_room(0, getattr(result, "size_hint", 0))
+        scratch = bytearray(self.buffer_size)
+        filled = 0
+        while True:
+            if filled < len(data):
+                with memoryview(data) as view, view[filled:filled + self.buffer_size] as chunk:
+                    size = stream.readinto(chunk)
+            else:
+                size = stream.readinto(scratch)
+                with memoryview(scratch) as view, view[:size] as chunk:
+                    data.extend(chunk)
+                bytestr.fill(scratch, 0)
+            if not size:
+                break
+            filled += size
+        data.truncate(filled)
+
+    def _write_data(self, stream, result):
+        # Copies GPG's stdout to result.output_file through a scratch buffer.
+        # gpg has to be drained even if a write fails, so the first error is
+        # kept for encrypt_file to raise
+        result.data = bytestr()
+        scratch = bytearray(self.buffer_size)
+        while True:
+            size = stream.readinto(scratch)
+            if not size:
+                break
+            if result.output_error is None:
+                try:
+                    with memoryview(scratch) as view, view[:size] as chunk:
+                        result.output_file.write(chunk)
+                except OSError as e:
+                    result.output_error = e
+        bytestr.fill(scratch, 0)
+
+    @classmethod
+    def kill_agent(restart=True):
+        from sh import Command
+        Command("gpg-connect-agent")(_in="KILLAGENT\n",_out="/dev/null")
@@ -1,57 +1,188 @@
-from sh import Command
 from bytestr import bytestr
-from secrets import token_bytes, token_hex
-from hashlib import scrypt
-from gnupg import GPG
-from os import scandir, mkdir, rmdir, remove
-from collections import defaultdict
-from pprint import pprint
-
-
-class BytestrGPG(GPG):
-    """GPG but all data read into bytestr so it can be cleared from RAM
-    Also provides a kill agent method to reset password requirement.
-    """
-    def __init__(self):
-        super().__init__(gpgbinary='gpg', gnupghome=None, verbose=False,
-                 use_agent=False, keyring=None, options=None,
-                 secret_keyring=None)
-
-    def _read_data(self, stream, result, on_data=None):
-        # Read the contents of the file from GPG's stdout 
-        result.data = bytestr()
-        data = stream.read(1)
-        while data:
-            result.data += data
-            data = stream.read(1)
-
-    @classmethod
-    def kill_agent(restart=True):
-        Command("gpg-connect-agent")(_in="KILLAGENT\n",_out="/dev/null")        
+from securemem import ExpiringSecret
+from kdf import derive_key
+from os import scandir, mkdir, rmdir, remove, urandom
+from os import close, pipe, readv, set_blocking, write
+from io import StringIO
+from math import log2
+from collections import Counter, defaultdict
+from sys import is_finalizing
+from threading import Lock
+from weakref import WeakValueDictionary
+
+# gnupg, asyncio, concurrent.futures and sh are imported where they are
+# first needed, so importing cryptdict only costs bytestr and the KDFs
+
+
+def __getattr__(name):
+    # BytestrGPG lives in bytestrgpg so that gnupg loads with the first gpg call
+    if name == "BytestrGPG":
+        from bytestrgpg import BytestrGPG
+        return BytestrGPG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def byte_entropy(data):
+    """Shannon entropy of a bytes-like object in bits per byte, close to 8
+    for random bytes and about 4 for hex"""
+    counts = Counter(bytestr.parse_buffer(data))
+    return sum(count / len(data) * log2(len(data) / count) for count in counts.values())
+
+
+class ChunkReader(object):
+    """Binary file object over an iterable of bytes-like chunks for gpg to
+    read from. A chunk that is a mutable buffer, e.g. a bytestr, is wiped as
+    soon as all of it has been read"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.view = None
+        self.offset = 0
+        # gpg's copier only logs read errors, so the first one is kept here
+        self.error = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = 0
+        with memoryview(buffer) as out:
+            while size < len(out):
+                try:
+                    if self.view is None and not self._next_chunk():
+                        break
+                except Exception as e:
+                    self.error = self.error or e
+                    raise
+                count = min(len(out) - size, len(self.view) - self.offset)
+                out[size:size + count] = self.view[self.offset:self.offset + count]
+                size += count
+                self.offset += count
+                if self.offset == len(self.view):
+                    self._wipe_chunk()
+        return size
+
+    def read(self, size=-1):
+        chunks = []
+        buffer = bytearray(size if size is not None and size >= 0 else 1 << 16)
+        while True:
+            count = self.readinto(buffer)
+            chunks.append(bytes(buffer[:count]))
+            if not count or size is not None and size >= 0:
+                break
+        bytestr.fill(buffer, 0)
+        return b"".join(chunks)
+
+    def peek(self, size):
+        """memoryview of up to size bytes from the next chunk, without consuming them"""
+        if self.view is None and not self._next_chunk():
+            return memoryview(b"")
+        return self.view[self.offset:self.offset + size]
+
+    def close(self):
+        self._wipe_chunk()
+
+    def _next_chunk(self):
+        for chunk in self.chunks:
+            buf = bytestr.parse_buffer(chunk)
+            if buf is None:
+                raise TypeError(f"chunks must be bytes-like, not {type(chunk).__name__}")
+            if len(buf):
+                self.view = memoryview(buf)
+                self.offset = 0
+                return True
+        return False
+
+    def _wipe_chunk(self):
+        if self.view is not None:
+            if not self.view.readonly:
+                bytestr.fill(self.view, 0)
+            self.view.release()
+            self.view = None
+
+
+class SharedGPG(object):
+    """Class attribute holding one BytestrGPG for every instance of the
+    class, created with kwargs on first access. Its pooled gpg processes are
+    stopped once every instance that used it has released it"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.gpg = None
+        self.users = set()
+        self.lock = Lock()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self.lock:
+            if self.gpg is None:
+                from bytestrgpg import BytestrGPG
+                self.gpg = BytestrGPG(**self.kwargs)
+            self.users.add(id(instance))
+            return self.gpg
+
+    def release(self, instance):
+        with self.lock:
+            self.users.discard(id(instance))
+            if self.users or self.gpg is None:
+                return
+            gpg, self.gpg = self.gpg, None
+        # Joining the pool's thread can hang at interpreter exit, and the idle
+        # gpg processes exit by themselves once their stdin closes
+        if gpg.process_pool is not None and not is_finalizing():
+            gpg.process_pool.close()
+
 
 class Cryptdict(dict):
     """Memory secure, GPG encrypted replacement for dict based on bytestr.py and gnupg.py"""
-    gpg = BytestrGPG()
+    gpg = SharedGPG(io_mode="select")
+    # The passphrase is already a 512 bit scrypt key, so gpg's own iterated
+    # S2K is kept at its minimum count instead of ~0.5s of stretching per item.
+    # Without a random_seed file concurrent gpg processes do not queue on its lock
+    GPG_EXTRA_ARGS = ("--s2k-mode", "3", "--s2k-count", "65536", "--no-random-seed-file")
+    COMPRESSION_MODES = ("off", "on", "auto")
+    # auto compression looks at this much of the start of an item and skips
+    # items that are too small to gain or look random
+    COMPRESSION_SAMPLE_SIZE = 4096
+    COMPRESSION_MIN_SIZE = 512
+    COMPRESSION_MAX_ENTROPY = 7.0
+    HEX_DIGITS = b"0123456789abcdef"
     
-    def __init__(self, name, path, cipher="AES256", master_key_fp=None, from_dict={}):
+    def __init__(self, name, path, cipher="AES256", master_key_fp=None, from_dict={},
+                 key_ttl=300, key_max_uses=None, kdf_profile="interactive",
+                 armor=False, compression="auto"):
+        if compression not in self.COMPRESSION_MODES:
+            raise ValueError(f"compression must be one of {', '.join(self.COMPRESSION_MODES)}")
+        # Set by destroy(), which __del__ runs again
+        self.destroyed = False
         self.bytestr_dict = defaultdict(list)
+        # Results handed out by getmany, held weakly so dropping one wipes it
+        self.loose_bytestrs = WeakValueDictionary()
         self.cipher = cipher
+        # Items are binary OpenPGP packets unless armor is set
+        self.armor = armor
+        self.compression = compression
         self.recipients = master_key_fp
+        # Name from kdf.KDF_PROFILES or a list of (kdf name, params) pairs
+        self.kdf_profile = kdf_profile
 
         self.name = name
         self.path = self._get_bytestr("attrs", path + name)
-        self.key_offset = self._get_bytestr("attrs", token_hex(16))
+        self.key_offset = self._get_bytestr("attrs", urandom(16).hex())
 
         if name not in (e.name for e in scandir(path)):
             mkdir(self.path)
         
-        self.token_bytestr = self._get_bytestr("auth", token_bytes(256))
-        self.salt_bytestr = self._get_bytestr("auth", token_bytes(64))
+        self.token_bytestr = self._get_bytestr("auth", urandom(256))
+        self.salt_bytestr = self._get_bytestr("auth", urandom(64))
         self.kdf_bytestr = self._get_bytestr("auth")
         self.key_bytestr = self._get_bytestr("auth")
+        # Derived key is kept in locked memory for key_ttl seconds or key_max_uses uses
+        self.key_cache = ExpiringSecret(key_ttl, key_max_uses)
         
-        for k in from_dict:
-            self[k] = from_dict[k]
+        if from_dict:
+            self.setmany(from_dict)
             
 
         print(self.bytestr_dict)
@@ -62,58 +193,231 @@ class Cryptdict(dict):
         if kwargs.pop("clearmem",False) or bytestr_dict_key not in ("auth", "attrs", "temp"):
             self._delbytestr(bytestr_dict_key)
 
-        self.bytestr_dict[bytestr_dict_key].append(bytestr(*args,**kwargs))
+        self.bytestr_dict[bytestr_dict_key].append(bytestr.pool.acquire_copy(*args,**kwargs))
         return self.bytestr_dict[bytestr_dict_key][-1]
 
     def _get_key(self,k):
         return f"{k}_{self.key_offset}"
 
     def wipe_keys(self):
+        self.key_cache.invalidate()
         self.key_bytestr.clearmem()
         self.kdf_bytestr.clearmem() 
 
     @property
     def scrypt_key(self):
-        self.wipe_keys()
+        # A private LockedBytestr copy of the key, destroy it when done
+        return self.key_cache.get(self._derive_key)
+
+    def _derive_key(self):
+        # Runs the KDF into key_bytestr, which the key cache copies into locked memory and wipes
         self.kdf_bytestr.extend(f'{id(self)}')
         self.kdf_bytestr.extend(self.token_bytestr)
         self.kdf_bytestr.extend(f'{id(self.kdf_bytestr)}')
-        self.key_bytestr += scrypt(self.kdf_bytestr, salt=self.salt_bytestr, n=1024, r=8, p=1, dklen=64).hex()
+        key = derive_key(self.kdf_bytestr, self.salt_bytestr, self.kdf_profile)
+        self.kdf_bytestr.clearmem()
+        # Hex digits are written straight into key_bytestr, key.hex() would be an immutable str
+        start = len(self.key_bytestr)
+        self.key_bytestr._make_room(start, 2 * len(key))
+        with memoryview(self.key_bytestr) as view:
+            for offset, byte in zip(range(start, start + 2 * len(key), 2), key):
+                view[offset] = self.HEX_DIGITS[byte >> 4]
+                view[offset + 1] = self.HEX_DIGITS[byte & 15]
+        bytestr.destroy(key)
         return self.key_bytestr
 
     def __setitem__(self,k,v):
         print(f"SET ITEM {k}")
-        item_path = self.getpath(k, f"{self.path}/{token_hex(16)}.pgp")
-        gpg_kwargs = { "recipients":self.recipients, 
-                       "symmetric":self.cipher, 
-                       "passphrase":self.scrypt_key,
-                       "output":item_path }
-        if type(v) is bytestr:
-            v = v.IO
-        if hasattr(v,"read"):
-            encrypt_result = self.gpg.encrypt_file(v, **gpg_kwargs)
-        else:
-            encrypt_result = self.gpg.encrypt(v, **gpg_kwargs)                          
-        self.wipe_keys()
+        passphrase = self.scrypt_key
+        try:
+            item_path = self._encrypt_item(k, v, passphrase)
+        finally:
+            passphrase.destroy()
+
+        if item_path:
+            self._store_item(k, item_path)
+
+    def _store_item(self, k, item_path):
+        # Files the new ciphertext under k and removes the file it replaces
+        old_path = self.getpath(k)
+        super().__setitem__(k, item_path)
+        if old_path:
+            remove(path=old_path)
+
+    def setmany(self, mapping, workers=4):
+        """Encrypts every item of mapping with a key derived once for the batch,
+        running up to workers gpg processes at a time. If any item fails the
+        rest are still stored and the first error is raised afterwards"""
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        items = dict(mapping)
+        print(f"SET {len(items)} ITEMS")
+        passphrase = self.scrypt_key
+        errors = []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._encrypt_item, k, v, passphrase): k
+                           for k, v in items.items()}
+                # Every item that was written is filed even if others failed,
+                # so its file is removed with the rest by destroy()
+                for future in as_completed(futures):
+                    try:
+                        item_path = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if item_path:
+                        self._store_item(futures[future], item_path)
+        finally:
+            passphrase.destroy()
+        if errors:
+            raise errors[0]
+
+    def update(self, *args, **kwargs):
+        self.setmany(dict(*args, **kwargs))
+
+    def set_stream(self, k, source):
+        """Encrypts a file object or an iterable of bytes-like chunks into the
+        item for k. Chunks go to gpg one at a time and gpg writes the item file
+        itself, so neither the plaintext nor the ciphertext is held in memory"""
+        print(f"SET STREAM {k}")
+        passphrase = self.scrypt_key
+        try:
+            item_path = self._encrypt_item(k, source, passphrase, stream=True)
+        finally:
+            passphrase.destroy()
+
+        if item_path:
+            self._store_item(k, item_path)
+
+    def _encrypt_item(self, k, v, passphrase, stream=False):
+        # Returns the path of a new file holding the ciphertext or None if gpg
+        # failed, so a failure leaves the item's current file intact
+        item_path = f"{self.path}/{urandom(16).hex()}.pgp"
+        # A bytestr is read straight from its buffer, which is wiped as it goes
+        reader = None
+        if type(v) is bytestr or stream and not hasattr(v, "read"):
+            chunks = (v,) if isinstance(v, (str, bytes, bytearray, memoryview)) else v
+            reader = ChunkReader(chunks)
+        encrypt_result = None
+        try:
+            # Sampling for the compression policy may read the first chunk,
+            # which has to be wiped below even if that fails
+            gpg_kwargs = { "recipients":self.recipients, 
+                           "symmetric":self.cipher, 
+                           "passphrase":passphrase,
+                           "armor":self.armor,
+                           "extra_args":[*self._compression_args(v, reader), *self.GPG_EXTRA_ARGS] }
+            # gpg's stdout is written to the open file rather than passing
+            # --output, so every call has the same gpg command line and can
+            # use a pooled process
+            with open(item_path, "wb") as item:
+                gpg_kwargs["output"] = item
+                if reader is not None:
+                    encrypt_result = self.gpg.encrypt_file(reader, **gpg_kwargs)
+                elif hasattr(v,"read"):
+                    encrypt_result = self.gpg.encrypt_file(v, **gpg_kwargs)
+                else:
+                    encrypt_result = self.gpg.encrypt(v, **gpg_kwargs)
+        finally:
+            if reader is not None:
+                reader.close()
+            if type(v) is bytestr:
+                v.clearmem()
+            if encrypt_result is None or not encrypt_result.ok or reader is not None and reader.error:
+                try:
+                    remove(path=item_path)
+                except FileNotFoundError:
+                    pass
+        if reader is not None and reader.error:
+            raise reader.error
 
         if encrypt_result.ok:
-            super().__setitem__(k,item_path)
+            encrypt_result.data.clearmem()
+            return item_path
      
+    def _compression_args(self, v, reader=None):
+        # gpg arguments for the compression policy, "on" leaves gpg's default
+        if self.compression == "auto":
+            sample = self._sample_entropy(v, reader)
+            compress = sample is None or (sample[0] >= self.COMPRESSION_MIN_SIZE
+                                          and sample[1] <= self.COMPRESSION_MAX_ENTROPY)
+        else:
+            compress = self.compression == "on"
+        return [] if compress else ["--compress-level", "0"]
+
+    def _sample_entropy(self, v, reader=None):
+        # (size, entropy) of the start of v or None if it can't be looked at
+        # without consuming it, read samples are wiped afterwards
+        size = self.COMPRESSION_SAMPLE_SIZE
+        if reader is not None:
+            with reader.peek(size) as sample:
+                return len(sample), byte_entropy(sample) if sample else 0.0
+        if hasattr(v, "read"):
+            if not (hasattr(v, "readinto") and hasattr(v, "seekable") and v.seekable()):
+                return None
+            sample = bytearray(size)
+            position = v.tell()
+            size = v.readinto(sample) or 0
+            v.seek(position)
+            with memoryview(sample) as view, view[:size] as chunk:
+                entropy = byte_entropy(chunk) if size else 0.0
+            bytestr.fill(sample, 0)
+            return size, entropy
+        buf = bytestr.parse_buffer(v[:size] if isinstance(v, str) else v)
+        if buf is None:
+            return None
+        with memoryview(buf) as view, view[:size] as sample:
+            return len(sample), byte_entropy(sample) if sample else 0.0
+
     def __getitem__(self,k):
         print(f"GET ITEM {k}")
         item_path = self.getpath(k)
         if item_path:
-            with open(item_path,"rb",buffering=0) as item:
-                decrypt_result = self.gpg.decrypt_file(item, passphrase=self.scrypt_key)
-                self.wipe_keys()
-
-                if decrypt_result.ok:
-                    data = self._get_bytestr(self._get_key(k), decrypt_result.data, clearmem=True)
-                    decrypt_result.data.clearmem()
-                    del decrypt_result
-                else:
-                    raise ValueError
-            return data
+            passphrase = self.scrypt_key
+            try:
+                plaintext = self._decrypt_item(k, passphrase)
+            finally:
+                passphrase.destroy()
+            return self._get_bytestr(self._get_key(k), plaintext, clearmem=True)
+
+    def getmany(self, keys, workers=4):
+        """Decrypts the items for keys on up to workers threads and yields
+        (key, bytestr) pairs as each one completes. Keys that are not in the
+        Cryptdict are skipped. Each result is wiped once the consumer drops it
+        or by destroy(), whichever comes first. Closing the iterator early
+        cancels what has not started and wipes every result that was not
+        yielded"""
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        keys = list(keys)
+        print(f"GET {len(keys)} ITEMS")
+        passphrase = self.scrypt_key
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(self._decrypt_item, k, passphrase): k
+                   for k in keys if self.getpath(k)}
+        try:
+            for future in as_completed(futures):
+                k = futures.pop(future)
+                # Not filed in bytestr_dict, which would keep it alive after it is dropped
+                plaintext = future.result()
+                self.loose_bytestrs[id(plaintext)] = plaintext
+                del future
+                yield k, plaintext
+                del plaintext
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future in futures:
+                if not future.cancelled() and future.exception() is None:
+                    bytestr.destroy(future.result())
+            passphrase.destroy()
+
+    def _decrypt_item(self, k, passphrase):
+        # Returns the decrypted bytestr and leaves keeping it to the caller
+        with open(self.getpath(k),"rb",buffering=0) as item:
+            decrypt_result = self.gpg.decrypt_file(item, passphrase=passphrase)
+        if not decrypt_result.ok:
+            decrypt_result.data.clearmem()
+            raise ValueError
+        return decrypt_result.data
         
     def get(self, k, default=None):
         return self[k] or default
@@ -122,7 +426,12 @@ class Cryptdict(dict):
         return super().get(k, default)
 
     def _delbytestr(self,k):
-        for i, data_bytestr in enumerate(self.bytestr_dict[k]):
+        # Drops and wipes every bytestr filed under k. None go back to the pool:
+        # item values were handed to the caller and auth and attrs buffers are
+        # still referenced by attributes like path, so reusing them would hand
+        # another Cryptdict buffers this one still acts on
+        while self.bytestr_dict[k]:
+            data_bytestr = self.bytestr_dict[k].pop()
             data_bytestr.clearmem()
             del data_bytestr
         #del self.bytestr_dict[k]
@@ -140,24 +449,232 @@ class Cryptdict(dict):
         self.destroy()
 
     def destroy(self):
+        # Also runs from __del__ at interpreter exit, so nothing here may import
+        if getattr(self, "destroyed", True):
+            return
+        self.destroyed = True
         print(f"\nBEGIN DEL {self.path}\n")
-        pprint( self.__dict__)
+        self.key_cache.invalidate()
         self._delbytestr("auth")
+        for data_bytestr in list(self.loose_bytestrs.values()):
+            data_bytestr.clearmem()
         print("\nDESTROYED AUTH",)
-        pprint( self.__dict__)
         for k, path in self.items():
             self._delbytestr(self._get_key(k))
             remove(path=path)
+        super().clear()
         
         print("\nREMOVED ALL FILES AND DESTROYED ALL USER DATA")
-        pprint(self.__dict__)
         rmdir(self.path)
         self._delbytestr("attrs")
         self._delbytestr("temp")
         print("\nREMOVED ALL ATTRS AND TEMP DATA")
-        pprint(self.__dict__)
+        type(self).gpg.release(self)
         print("\n---DONE---\n")     
 
 
+class AsyncCryptdict(Cryptdict):
+    """Cryptdict for asyncio. get/set/delete are coroutines that talk to gpg
+    through pipes watched by the event loop instead of one thread per pipe,
+    and at most max_concurrency gpg processes run at once"""
+    READ_CHUNK_SIZE = 1 << 16
+
+    def __init__(self, *args, max_concurrency=64, **kwargs):
+        import asyncio
+        super().__init__(*args, **kwargs)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def get(self, k, default=None):
+        item_path = self.getpath(k)
+        if not item_path:
+            return default
+        with open(item_path,"rb") as item:
+            ciphertext = item.read()
+        plaintext = await self._run_gpg(["--decrypt"], ciphertext, size_hint=len(ciphertext))
+        return self._get_bytestr(self._get_key(k), plaintext, clearmem=True)
+
+    async def set(self, k, v):
+        """Encrypts v under k with the same gpg arguments as __setitem__. v is
+        a str, a bytes-like object or a file object, which is read into a
+        bytestr on a worker thread first as gpg is fed from memory here.
+        A bytestr v is cleared like __setitem__ does"""
+        import asyncio
+        if hasattr(v, "read"):
+            v = await asyncio.to_thread(self._read_file, v)
+        elif bytestr.parse_buffer(v) is None:
+            raise TypeError(f"AsyncCryptdict.set takes a str, a bytes-like or a file object, "
+                            f"not {type(v).__name__}")
+        try:
+            args = [*self._encrypt_args(), *(["--armor"] if self.armor else []),
+                    *self._compression_args(v), *self.GPG_EXTRA_ARGS]
+            ciphertext = await self._run_gpg(args, v)
+        finally:
+            if type(v) is bytestr:
+                v.clearmem()
+        item_path = f"{self.path}/{urandom(16).hex()}.pgp"
+        with open(item_path, "wb") as item:
+            item.write(ciphertext)
+        ciphertext.clearmem()
+        self._store_item(k, item_path)
+
+    def _encrypt_args(self):
+        # What gpg.encrypt_file makes of __setitem__'s symmetric and recipients
+        if self.cipher:
+            return ["--symmetric", *(["--cipher-algo", self.cipher] if self.cipher is not True else [])]
+        if not self.recipients:
+            raise ValueError("No recipients specified with asymmetric encryption")
+        recipients = [self.recipients] if isinstance(self.recipients, str) else self.recipients
+        return ["--encrypt", *(arg for recipient in recipients for arg in ("--recipient", recipient))]
+
+    def _read_file(self, fileobj):
+        # Reads fileobj to the end into a bytestr, readinto goes straight into its buffer
+        data = bytestr()
+        while True:
+            start = len(data)
+            if hasattr(fileobj, "readinto"):
+                data._make_room(start, self.READ_CHUNK_SIZE)
+                with memoryview(data) as view, view[start:] as room:
+                    size = fileobj.readinto(room) or 0
+                data.truncate(start + size)
+            else:
+                chunk = fileobj.read(self.READ_CHUNK_SIZE)
+                size = len(chunk)
+                data.extend(chunk)
+                bytestr.destroy(chunk)
+            if not size:
+                return data
+
+    async def delete(self, k):
+        del self[k]
+
+    async def _run_gpg(self, args, data, size_hint=0):
+        # Feeds the passphrase and data to gpg's stdin and returns its stdout
+        # as a bytestr. If gpg fails or the task is cancelled gpg is killed and
+        # everything read so far is wiped
+        import asyncio
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            passphrase = self.scrypt_key
+            output = bytestr()
+            stdin_read, stdin_write = pipe()
+            stdout_read, stdout_write = pipe()
+            set_blocking(stdin_write, False)
+            set_blocking(stdout_read, False)
+            process = writing = reading = None
+            try:
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *self.gpg.make_args(args, True), stdin=stdin_read,
+                        stdout=stdout_write, stderr=asyncio.subprocess.PIPE)
+                finally:
+                    close(stdin_read)
+                    close(stdout_write)
+
+                data = bytestr.parse_buffer(data)
+                writing = self._write_pipe(loop, stdin_write, (passphrase.view, b"\n", data))
+                stdin_write = None
+                reading = self._read_pipe(loop, stdout_read, output, size_hint)
+                stdout_read = None
+                stderr, _, _ = await asyncio.gather(process.stderr.read(), writing, reading)
+                await process.wait()
+                process = None
+
+                result = self.gpg.result_map["crypt"](self.gpg)
+                self.gpg._read_response(StringIO(stderr.decode(self.gpg.encoding)), result)
+                if not result.ok:
+                    raise ValueError(result.status)
+                return output
+            except BaseException:
+                for future in (writing, reading):
+                    if future is not None:
+                        future.cancel()
+                if process is not None and process.returncode is None:
+                    process.kill()
+                    await asyncio.shield(process.wait())
+                output.clearmem()
+                raise
+            finally:
+                passphrase.destroy()
+                for fd in (stdin_write, stdout_read):
+                    if fd is not None:
+                        close(fd)
+
+    @staticmethod
+    def _write_pipe(loop, fd, views):
+        # Writes each buffer in views to the non blocking fd whenever it is
+        # writable, then closes it. Returns a future for the last write
+        done = loop.create_future()
+        views = [memoryview(view) for view in views]
+
+        def on_writable():
+            try:
+                while views:
+                    if views[0].nbytes:
+                        views[0] = views[0][write(fd, views[0]):]
+                        if views[0].nbytes:
+                            return
+                    views.pop(0).release()
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
+                # gpg stopped reading, its status says why
+                pass
+            except OSError as e:
+                return finish(e)
+            finish(None)
+
+        def finish(error):
+            loop.remove_writer(fd)
+            close(fd)
+            for view in views:
+                view.release()
+            views.clear()
+            if error is not None:
+                done.set_exception(error)
+            elif not done.done():
+                done.set_result(None)
+
+        # A cancelled write never reaches finish by itself
+        done.add_done_callback(lambda future: future.cancelled() and finish(None))
+        loop.add_writer(fd, on_writable)
+        return done
+
+    def _read_pipe(self, loop, fd, output, size_hint):
+        # Reads the non blocking fd into the room left in output, growing it
+        # READ_CHUNK_SIZE at a time, until EOF. Returns a future for EOF
+        done = loop.create_future()
+        output._make_room(0, size_hint)
+        filled = [0]
+
+        def on_readable():
+            try:
+                if filled[0] == len(output):
+                    output._make_room(filled[0], self.READ_CHUNK_SIZE)
+                with memoryview(output) as view, view[filled[0]:] as room:
+                    size = readv(fd, [room])
+            except BlockingIOError:
+                return
+            except OSError as e:
+                return finish(e)
+            if size:
+                filled[0] += size
+                return
+            output.truncate(filled[0])
+            finish(None)
+
+        def finish(error):
+            loop.remove_reader(fd)
+            close(fd)
+            if error is not None:
+                done.set_exception(error)
+            elif not done.done():
+                done.set_result(None)
+
+        # A cancelled read never reaches finish by itself
+        done.add_done_callback(lambda future: future.cancelled() and finish(None))
+        loop.add_reader(fd, on_readable)
+        return done
+
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
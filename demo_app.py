@@ -1,4 +1,4 @@
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 from os import getpid
 from re import finditer
 
@@ -6,23 +6,46 @@ from bytestr import bytestr
 from cryptdict import Cryptdict
 
 
-def build_and_connect(widget, filename):
-    """Builds Gtk Widgets from .glade file and updates caller's
-    attrs with widgets named by their id"""
-    with open(f"ui/{filename}.glade", "r+") as glade_file:
-        glade_xml = glade_file.read()
-        
+class GladeTemplate(object):
+    """A .glade file read once along with the ids of the objects it defines,
+    so each new widget is built from memory"""
+
+    def __init__(self, filename):
+        with open(f"ui/{filename}.glade", "r") as glade_file:
+            self.xml = glade_file.read()
+        self.ids = tuple(m[1] for m in finditer(r"id=\"([\w\d]+)\"", self.xml))
+
+    def build(self, widget):
         #Build child widgets then connect signals to caller
-        builder = Gtk.Builder().new_from_string(glade_xml, len(glade_xml))
+        builder = Gtk.Builder.new_from_string(self.xml, len(self.xml))
         builder.connect_signals(widget)
 
-    #Update caller's attrs so child widgets don't need to be manually added
-    id_iter  = (m[1] for m in finditer(r"id=\"([\w\d]+)\"", glade_xml))
-    widget.__dict__.update({obj_id: builder.get_object(obj_id) for obj_id in id_iter})
+        #Update caller's attrs so child widgets don't need to be manually added
+        widget.__dict__.update({obj_id: builder.get_object(obj_id) for obj_id in self.ids})
+
+
+# GladeTemplate for each .glade file that has been built from, by filename
+glade_templates = {}
+
+
+def glade_template(filename):
+    """Returns the GladeTemplate for ui/filename.glade, reading it on first use"""
+    if filename not in glade_templates:
+        glade_templates[filename] = GladeTemplate(filename)
+    return glade_templates[filename]
+
+
+def build_and_connect(widget, filename):
+    """Builds Gtk Widgets from .glade file and updates caller's
+    attrs with widgets named by their id"""
+    glade_template(filename).build(widget)
     
 
 class SecureEntryDemo(Gtk.Application):
     DEMO_PATH = "cryptdict-data/"
+    # Bytes inserted into output_buffer per step. Anything longer is rendered
+    # one step per idle callback so the window keeps responding
+    RENDER_CHUNK_SIZE = 4096
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -31,6 +54,9 @@ class SecureEntryDemo(Gtk.Application):
         self.cryptdicts = []
         # Container for CryptdictDisplayWidget objects
         self.cryptdict_widgets = []
+        # Steps and GLib idle source of the data being rendered, if any
+        self.render = None
+        self.render_source = None
 
     def do_activate(self):
         """Builds toplevel window and creates Cryptdict from demo_data"""
@@ -49,8 +75,8 @@ class SecureEntryDemo(Gtk.Application):
                      "Fiat Balance":"$1,000,000"}
         
         self.do_create_cryptdict(name="Demo Cryptdict")
-        for k,v in demo_data.items():
-            self.cryptdict_widgets[0].do_encrypt_item(k, bytestr(v))
+        self.cryptdict_widgets[0].do_encrypt_items(
+            {k: bytestr(v) for k, v in demo_data.items()})
 
     def do_create_cryptdict(self,name):
         """Appends Cryptdict and CryptdictDisplayWidget to corresponding lists"""
@@ -66,6 +92,7 @@ class SecureEntryDemo(Gtk.Application):
 
     def do_destroy_cryptdict_and_widget(self, index):
         """destroys Cryptdict and CryptdictDisplayWidget at index"""    
+        self.do_cancel_render()
         self.cryptdict_widgets[index].expander.destroy()
         self.cryptdicts[index].destroy()
         del self.cryptdicts[index]
@@ -92,8 +119,48 @@ class SecureEntryDemo(Gtk.Application):
 
     def on_clear_output_button_clicked(self, *args):
         """clears contents of output text buffer"""
+        self.do_cancel_render()
         self.output_buffer.set_text("", 0)
 
+    def do_render_output(self, data):
+        """Replaces the contents of output_buffer with the bytestr data, then
+            wipes data. Each step decodes RENDER_CHUNK_SIZE bytes straight from
+            data's buffer and inserts them at the end iterator, so no str of
+            the whole secret is ever made. The first chunk is inserted right
+            away and the rest from GLib idle callbacks, any render still
+            running is cancelled"""
+        self.do_cancel_render()
+        self.output_buffer.set_text("", 0)
+        self.render = self._render_steps(data)
+        if self._render_step():
+            self.render_source = GLib.idle_add(self._render_step)
+
+    def _render_step(self):
+        if next(self.render, False):
+            return GLib.SOURCE_CONTINUE
+        self.render = self.render_source = None
+        return GLib.SOURCE_REMOVE
+
+    def _render_steps(self, data):
+        # Inserts one chunk per step, data is wiped once it is all in or the render is cancelled
+        try:
+            for start in range(0, len(data), self.RENDER_CHUNK_SIZE):
+                if start:
+                    yield True
+                with memoryview(data) as view, view[start:start + self.RENDER_CHUNK_SIZE] as chunk:
+                    text = str(chunk, "latin-1")
+                self.output_buffer.insert(self.output_buffer.get_end_iter(), text, -1)
+        finally:
+            data.clearmem()
+
+    def do_cancel_render(self):
+        """Stops the render in progress, if any, and wipes its data"""
+        if self.render_source is not None:
+            GLib.source_remove(self.render_source)
+        if self.render is not None:
+            self.render.close()
+        self.render = self.render_source = None
+
     
 class CryptdictDisplayWidget(object):
     def __init__(self, parent, cryptdict):
@@ -115,37 +182,39 @@ class CryptdictDisplayWidget(object):
     def do_encrypt_item(self, key, data):
         """Adds key:data pair to self.cryptdict. Destroys data and clears entry_buffer.
             Then creates and displays a CryptdictItemWidget. """ 
-        # Encrypt data and add to self.cryptdict
-        self.cryptdict[key] = data
-        
-        # Clear contents of data (bytestr) and entry_buffer
-        data.clearmem()
+        self.do_encrypt_items({key: data})
         self.entry_buffer.set_text("",0)
-        
-        # Create and display CryptdictItemWidget
-        self.item_widgets[key] = CryptdictItemWidget(self, key)
-        self.item_box.pack_start(self.item_widgets[key].expander, True, True, 0)
-        self.on_changed()
+
+    def do_encrypt_items(self, items):
+        """Adds every key:data pair in items to self.cryptdict in one batch and
+            destroys the data. Then creates and displays a CryptdictItemWidget
+            for each item. """
+        # Encrypt data and add to self.cryptdict. If setmany raises, the items
+        # it did store still get widgets before the error propagates
+        try:
+            self.cryptdict.setmany(items)
+        finally:
+            for key, data in items.items():
+                # Clear contents of data (bytestr)
+                data.clearmem()
+
+                # Create and display CryptdictItemWidget
+                if key in self.cryptdict and key not in self.item_widgets:
+                    self.item_widgets[key] = CryptdictItemWidget(self, key)
+                    self.item_box.pack_start(self.item_widgets[key].expander, True, True, 0)
+            self.on_changed()
     
     def do_decrypt_item(self, key):
         """Decrypts item corresponding to key with BytestrGPG so 
             that decrypt_data is returned as a bytestr. Then decrypted_data is 
-            inserted into output_buffer byte by byte to avoid allocating an immutable 
-            str or bytes object""" 
-
-        self.parent.output_buffer.set_text("",0)
-        decrypted_data = self.cryptdict[key]
-        for pos, byte in enumerate(decrypted_data):
-            # Get GtkTextIter offset by the position/index of each char
-            cursor = self.parent.output_buffer.get_iter_at_offset(pos)
-            # Insert char into output buffer
-            self.parent.output_buffer.insert(cursor, chr(byte), 1)
-        
-        # Destroy decrypted data
-        decrypted_data.clearmem()
+            rendered into output_buffer a chunk at a time to avoid allocating an
+            immutable str or bytes object of all of it, and destroyed""" 
+        self.parent.do_render_output(self.cryptdict[key])
 
     def do_remove_item(self, key):
         """ Removes and destroys Cryptdict item at corresponding to key"""
+        # The item's bytestr is released below, so it can't still be rendering
+        self.parent.do_cancel_render()
         del self.cryptdict[key]
         self.item_widgets[key].expander.destroy()
         del self.item_widgets[key]
@@ -158,7 +227,9 @@ class CryptdictDisplayWidget(object):
         self.frame_label.set_text(self.cryptdict.name)
         self.path_label.set_text(str(self.cryptdict.path))
         self.id_label.set_text(str(id(self.cryptdict)))
-        self.scrypt_label.set_text(str(self.cryptdict.scrypt_key))
+        scrypt_key = self.cryptdict.scrypt_key
+        self.scrypt_label.set_text(str(scrypt_key))
+        scrypt_key.destroy()
         self.num_items_label.set_text(f"Items ({len(self.item_widgets)})")
 
         self.entry_view_buffer.set_text(self.entry_buffer.get_text(), 
@@ -193,7 +264,9 @@ class CryptdictItemWidget(object):
 
         with bytestr() as view_bytestr, open(filepath, "rb", buffering=0) as f:
             view_bytestr += bytestr(f.read())
-            self.view_buffer.set_text(str(view_bytestr), len(view_bytestr))
+            # Binary OpenPGP packets are shown as hex, armored ones as they are
+            text = str(view_bytestr) if self.parent.cryptdict.armor else view_bytestr.hex(" ", 2)
+            self.view_buffer.set_text(text, len(text))
 
     def on_remove_item_button_clicked(self, *args):
         self.parent.do_remove_item(self.key)        
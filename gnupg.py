@@ -34,11 +34,20 @@ https://gnupg.readthedocs.io/
 """
 
 import codecs
+from collections import OrderedDict
 from io import StringIO
+import json
 import logging
 import os
 import re
+import shutil
 import socket
+import stat
+
+try:
+    import selectors
+except ImportError:  # pragma: no cover
+    selectors = None
 from subprocess import Popen, PIPE
 import sys
 import threading
@@ -135,34 +144,117 @@ def no_quote(s):
     return s
 
 
-def _copy_data(instream, outstream):
+_default_buffer_size = None
+
+
+def default_buffer_size():
+    """
+    Return the buffer size `GPG` uses when none is given: the capacity of a pipe on this system, so a single read
+    or write moves as much as `gpg` can take at once. This is looked up once and then cached.
+    """
+    global _default_buffer_size
+    if _default_buffer_size is None:
+        try:
+            import fcntl
+            rfd, wfd = os.pipe()
+            try:
+                _default_buffer_size = fcntl.fcntl(wfd, fcntl.F_GETPIPE_SZ)
+            finally:
+                os.close(rfd)
+                os.close(wfd)
+        except (ImportError, AttributeError, OSError):  # pragma: no cover
+            _default_buffer_size = 65536
+    return _default_buffer_size
+
+
+def _sendfile_source(instream):
+    # Return the fd and offset of instream if it is a regular file that os.sendfile() can read from, else None
+    if not hasattr(os, 'sendfile'):  # pragma: no cover
+        return None
+    try:
+        fd = instream.fileno()
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            return None
+        return fd, instream.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _sendfile_data(instream, outstream, buffer_size):
+    # Copy a regular file to outstream without reading it into Python. Returns the number of bytes sent, or None
+    # if the kernel can't do it for these streams and nothing was sent
+    source = _sendfile_source(instream)
+    if source is None:
+        return None
+    fd, offset = source
+    try:
+        outfd = outstream.fileno()
+        outstream.flush()
+    except (AttributeError, OSError, ValueError):
+        return None
+    sent = 0
+    while True:
+        try:
+            size = os.sendfile(outfd, fd, offset + sent, buffer_size)
+        except OSError:
+            if sent:
+                raise
+            return None
+        if not size:
+            break
+        sent += size
+    instream.seek(offset + sent)
+    return sent
+
+
+def _copy_data(instream, outstream, buffer_size=1024):
     # Copy one stream to another
     sent = 0
     if hasattr(sys.stdin, 'encoding'):
         enc = sys.stdin.encoding
     else:  # pragma: no cover
         enc = 'ascii'
-    while True:
-        # See issue #39: read can fail when e.g. a text stream is provided
-        # for what is actually a binary file
-        try:
-            data = instream.read(1024)
-        except Exception:  # pragma: no cover
-            logger.warning('Exception occurred while reading', exc_info=1)
-            break
-        if not data:
-            break
-        sent += len(data)
-        # logger.debug('sending chunk (%d): %r', sent, data[:256])
-        try:
-            outstream.write(data)
-        except UnicodeError:  # pragma: no cover
-            outstream.write(data.encode(enc))
-        except Exception:  # pragma: no cover
-            # Can sometimes get 'broken pipe' errors even when the data has all
-            # been sent
-            logger.exception('Error sending data')
-            break
+    try:
+        sent = _sendfile_data(instream, outstream, buffer_size)
+    except Exception:  # pragma: no cover
+        # Can sometimes get 'broken pipe' errors even when the data has all been sent
+        logger.exception('Error sending data')
+    if sent is not None:
+        logger.debug('sent %d bytes with sendfile', sent)
+    else:
+        sent = 0
+        # Binary streams are read into one reused buffer rather than a new bytes object per chunk
+        buf = bytearray(buffer_size) if hasattr(instream, 'readinto') else None
+        view = memoryview(buf) if buf is not None else None
+        while True:
+            # See issue #39: read can fail when e.g. a text stream is provided
+            # for what is actually a binary file
+            try:
+                if buf is not None:
+                    size = instream.readinto(buf)
+                    data = view[:size] if size else None
+                else:
+                    data = instream.read(buffer_size)
+            except Exception:  # pragma: no cover
+                logger.warning('Exception occurred while reading', exc_info=1)
+                break
+            if not data:
+                break
+            sent += len(data)
+            # logger.debug('sending chunk (%d): %r', sent, data[:256])
+            try:
+                outstream.write(data)
+            except UnicodeError:  # pragma: no cover
+                outstream.write(data.encode(enc))
+            except Exception:  # pragma: no cover
+                # Can sometimes get 'broken pipe' errors even when the data has all
+                # been sent
+                logger.exception('Error sending data')
+                break
+        if buf is not None:
+            # Don't leave the last chunk of the input lying around in memory
+            view.release()
+            buf[:] = bytes(buffer_size)
     try:
         outstream.close()
     except IOError:  # pragma: no cover
@@ -170,14 +262,165 @@ def _copy_data(instream, outstream):
     logger.debug('closed output, %d bytes sent', sent)
 
 
-def _threaded_copy_data(instream, outstream):
-    wr = threading.Thread(target=_copy_data, args=(instream, outstream))
+def _threaded_copy_data(instream, outstream, buffer_size=1024):
+    wr = threading.Thread(target=_copy_data, args=(instream, outstream, buffer_size))
     wr.daemon = True
     logger.debug('data copier: %r, %r, %r', wr, instream, outstream)
     wr.start()
     return wr
 
 
+class _SelectorStream(object):
+    """
+    A read-only view of a `gpg` process's stdout for `GPG._read_data()`. Every read also services the process's
+    stdin and stderr from a selector on the calling thread, so no copier or reader threads are needed.
+    """
+
+    def __init__(self, process, fileobj=None, encoding='latin-1', chunk_size=65536):
+        self.fileobj = fileobj
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.pending = None
+        self.stderr_chunks = []
+        self.source = self.sendfile_start = None
+        self.buffer = None
+        self.stdin = process.stdin
+        self.stdout = process.stdout.fileno()
+        self.stderr = process.stderr.fileno()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.stdout, selectors.EVENT_READ)
+        self.selector.register(self.stderr, selectors.EVENT_READ)
+        if fileobj is None:
+            self._close_stdin()
+        else:
+            os.set_blocking(self.stdin.fileno(), False)
+            self.selector.register(self.stdin.fileno(), selectors.EVENT_WRITE)
+            self.source = _sendfile_source(fileobj)
+            if self.source is not None:
+                self.sendfile_start = self.source[1]
+            elif hasattr(fileobj, 'readinto'):
+                self.buffer = bytearray(chunk_size)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+            data = self.read(self.chunk_size)
+            while data:
+                chunks.append(data)
+                data = self.read(self.chunk_size)
+            return b''.join(chunks)
+        buf = bytearray(size)
+        return bytes(buf[:self.readinto(buf)])
+
+    def readinto(self, buf):
+        # Waits until stdout has data, writing stdin and draining stderr meanwhile. Returns 0 at EOF
+        while self.stdout in self.selector.get_map():
+            for key, _ in self.selector.select():
+                if key.fd == self.stdout:
+                    size = os.readv(self.stdout, [buf])
+                    if not size:
+                        self.selector.unregister(self.stdout)
+                    return size
+                self._service(key.fd)
+        return 0
+
+    def drain(self):
+        """
+        Finish writing stdin and reading stderr once stdout is exhausted, returning what was read from stderr.
+        """
+        while self.selector.get_map():
+            for key, _ in self.selector.select():
+                if key.fd == self.stdout:
+                    # Nobody reads stdout any more, so discard what is left
+                    if not os.read(self.stdout, self.chunk_size):
+                        self.selector.unregister(self.stdout)
+                else:
+                    self._service(key.fd)
+        return b''.join(self.stderr_chunks).decode(self.encoding)
+
+    def close(self):
+        if self.fileobj is not None:
+            self._close_stdin()
+        if self.buffer is not None:
+            # Don't leave the last chunk of the input lying around in memory
+            self.buffer[:] = bytes(len(self.buffer))
+        self.selector.close()
+
+    def _service(self, fd):
+        if fd == self.stderr:
+            data = os.read(self.stderr, self.chunk_size)
+            if data:
+                self.stderr_chunks.append(data)
+            else:
+                self.selector.unregister(self.stderr)
+            return
+        if self.source is not None and self._sendfile():
+            return
+        if not self.pending:
+            try:
+                if self.buffer is not None:
+                    size = self.fileobj.readinto(self.buffer)
+                    data = memoryview(self.buffer)[:size] if size else None
+                else:
+                    data = self.fileobj.read(self.chunk_size)
+            except Exception:  # pragma: no cover
+                logger.warning('Exception occurred while reading', exc_info=1)
+                data = None
+            if not data:
+                self._close_stdin()
+                return
+            if isinstance(data, text_type):  # pragma: no cover
+                data = data.encode(self.encoding)
+            self.pending = memoryview(data)
+        try:
+            sent = os.write(self.stdin.fileno(), self.pending)
+        except BlockingIOError:  # pragma: no cover
+            return
+        except OSError:  # pragma: no cover
+            # e.g. broken pipe: gpg has stopped reading
+            logger.exception('Error sending data')
+            self._close_stdin()
+            return
+        self.pending = self.pending[sent:]
+
+    def _sendfile(self):
+        # Send the next chunk of a regular file without reading it into Python. Returns False if the kernel can't
+        # do it and nothing was sent yet, so the caller should fall back to reading
+        fd, offset = self.source
+        try:
+            sent = os.sendfile(self.stdin.fileno(), fd, offset, self.chunk_size)
+        except BlockingIOError:  # pragma: no cover
+            return True
+        except OSError:
+            if offset != self.sendfile_start:  # pragma: no cover
+                logger.exception('Error sending data')
+                self._close_stdin()
+                return True
+            self.source = None
+            if hasattr(self.fileobj, 'readinto'):
+                self.buffer = bytearray(self.chunk_size)
+            return False
+        if sent:
+            self.source = fd, offset + sent
+        else:
+            self.fileobj.seek(offset)
+            self._close_stdin()
+        return True
+
+    def _close_stdin(self):
+        if self.stdin.closed:
+            return
+        try:
+            self.selector.unregister(self.stdin.fileno())
+        except KeyError:
+            pass
+        self.pending = None
+        try:
+            self.stdin.close()
+        except IOError:  # pragma: no cover
+            logger.warning('Exception occurred while closing: ignored', exc_info=1)
+
+
 def _write_passphrase(stream, passphrase, encoding):
     passphrase = '%s\n' % passphrase
     passphrase = passphrase.encode(encoding)
@@ -999,10 +1242,145 @@ class Sign(StatusHandler, TextHandler):
 
 
 VERSION_RE = re.compile(r'^cfg:version:(\d+(\.\d+)*)'.encode('ascii'))
+
+# What each probed gpg can do, keyed by (binary path, gnupghome, binary mtime). See GPG.capabilities
+_capabilities = {}
+_capabilities_lock = threading.Lock()
 HEX_DIGITS_RE = re.compile(r'[0-9a-f]+$', re.I)
 PUBLIC_KEY_RE = re.compile(r'gpg: public key is (\w+)')
 
 
+class GPGProcessPool(object):
+    """
+    Keeps a few `gpg` processes started ahead of time for each recently used command line, so that a call
+    does not have to wait for a new process to start. `gpg` blocks on its stdin until it is handed out, and a
+    background thread tops the pool up again after each call.
+    """
+
+    def __init__(self, spawn, size=2, max_workers=8, max_commands=8):
+        """
+        Args:
+            spawn (callable): Called with a command line list, returns a started `Popen` object.
+
+            size (int): How many idle processes to keep ready for each command line.
+
+            max_workers (int): How many processes may be handed out at the same time. Further calls block until
+                               one is released.
+
+            max_commands (int): How many distinct command lines to keep processes ready for. Processes for the
+                                least recently used one are stopped first.
+        """
+        self.spawn = spawn
+        self.size = size
+        self.max_commands = max_commands
+        self.idle = OrderedDict()
+        self.busy = set()
+        self.workers = threading.BoundedSemaphore(max_workers)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.refiller = threading.Thread(target=self._refill)
+        self.refiller.daemon = True
+        self.refiller.start()
+
+    def acquire(self, cmd):
+        """
+        Return a started process for a command line, taking a waiting one from the pool if there is one.
+        Blocks while `max_workers` processes are already handed out.
+
+        Args:
+            cmd (list[str]): The full command line.
+        """
+        self.workers.acquire()
+        key = tuple(cmd)
+        process = None
+        with self.condition:
+            idle = self.idle.setdefault(key, [])
+            self.idle.move_to_end(key)
+            while idle and process is None:
+                process = idle.pop()
+                if process.poll() is not None:  # pragma: no cover
+                    self._stop(process)
+                    process = None
+            self.condition.notify()
+        if process is None:
+            try:
+                process = self.spawn(cmd)
+            except Exception:
+                self.workers.release()
+                raise
+        with self.condition:
+            self.busy.add(process)
+        return process
+
+    def release(self, process):
+        """
+        Hand back a process returned by `acquire()` once it has been waited for. Other processes are ignored.
+
+        Args:
+            process (Popen): The process.
+        """
+        with self.condition:
+            if process not in self.busy:
+                return
+            self.busy.remove(process)
+        self.workers.release()
+
+    def close(self):
+        """
+        Stop the background thread and every waiting process.
+        """
+        with self.condition:
+            self.closed = True
+            idle = [process for processes in self.idle.values() for process in processes]
+            self.idle.clear()
+            self.condition.notify()
+        for process in idle:
+            self._stop(process)
+        self.refiller.join()
+
+    @staticmethod
+    def _stop(process):
+        process.kill()
+        process.wait()
+        for stream in (process.stdin, process.stdout, process.stderr):
+            stream.close()
+
+    def _refill(self):
+        # Internal method: start processes for any command line that is short of idle ones, outside the
+        # lock so acquire() never waits on a process start that is not its own
+        while True:
+            with self.condition:
+                while True:
+                    if self.closed:
+                        return
+                    stale = []
+                    while len(self.idle) > self.max_commands:
+                        stale.extend(self.idle.popitem(last=False)[1])
+                    key = next((key for key, idle in self.idle.items() if len(idle) < self.size), None)
+                    if stale or key is not None:
+                        break
+                    self.condition.wait()
+            for process in stale:
+                self._stop(process)
+            if key is None:
+                continue
+            try:
+                process = self.spawn(list(key))
+            except Exception:  # pragma: no cover
+                logger.exception('Unable to start a pooled gpg process')
+                with self.condition:
+                    self.idle.pop(key, None)
+                continue
+            with self.condition:
+                if self.closed or key not in self.idle:
+                    stale = [process]
+                else:
+                    self.idle[key].append(process)
+                    stale = []
+            for process in stale:
+                self._stop(process)
+
+
 class GPG(object):
     """
     This class provides a high-level programmatic interface for `gpg`.
@@ -1036,7 +1414,12 @@ class GPG(object):
                  keyring=None,
                  options=None,
                  secret_keyring=None,
-                 env=None):
+                 env=None,
+                 pool_size=0,
+                 pool_workers=8,
+                 io_mode='threads',
+                 buffer_size=None,
+                 capability_cache_file=None):
         """Initialize a GPG process wrapper.
 
         Args:
@@ -1054,7 +1437,29 @@ class GPG(object):
                                        keyring files.
 
             env (dict): A dict of environment variables to be used for the GPG subprocess.
+
+            pool_size (int): If nonzero, encrypt and decrypt calls take their `gpg` process from a
+                             `GPGProcessPool` that keeps this many processes ready for each command line.
+
+            pool_workers (int): How many pooled `gpg` processes may run at the same time.
+
+            io_mode (str): ``'threads'`` feeds and drains each `gpg` process with helper threads. ``'select'``
+                           multiplexes its stdin, stdout and stderr with a selector on the calling thread instead,
+                           which saves starting three threads per call. It is not available on Windows.
+
+            buffer_size (int): How many bytes to move per read or write when passing data to and from `gpg`. The
+                               default is the result of `default_buffer_size()`.
+
+            capability_cache_file (str): A pathname for a JSON file where the results of probing `gpg` (see
+                                         `capabilities`) are kept between runs. By default they are only
+                                         kept in memory.
         """
+        if io_mode not in ('threads', 'select'):
+            raise ValueError('io_mode should be \'threads\' or \'select\': %s' % io_mode)
+        if io_mode == 'select' and (selectors is None or os.name == 'nt'):  # pragma: no cover
+            raise ValueError('io_mode \'select\' is not supported on this platform')
+        self.io_mode = io_mode
+        self.buffer_size = buffer_size or default_buffer_size()
         self.gpgbinary = gpgbinary
         self.gnupghome = gnupghome
         self.env = env
@@ -1084,8 +1489,60 @@ class GPG(object):
         # falling back to utf-8, because gpg itself uses latin-1 as the default
         # encoding.
         self.encoding = 'latin-1'
+        self.process_pool = None
+        self.capability_cache_file = capability_cache_file
+        self._capabilities = None
         if gnupghome and not os.path.isdir(self.gnupghome):  # pragma: no cover
             os.makedirs(self.gnupghome, 0o700)
+
+        # See issue #97. It seems gpg allow duplicate keys in keyrings, so we
+        # can't be too strict.
+        self.check_fingerprint_collisions = False
+        if pool_size:
+            self.process_pool = GPGProcessPool(self._popen, pool_size, pool_workers)
+
+    @property
+    def capabilities(self):
+        """
+        The version of `gpg` and the algorithms it supports, probed on first use.
+
+        `gpg` is only run once per binary, home directory and binary modification time in this process, and not
+        at all if ``capability_cache_file`` already has the answer.
+
+        Returns:
+            dict: ``'version'`` maps to a tuple of ints (or ``None`` if it couldn't be parsed), and ``'pubkey'``,
+                  ``'cipher'``, ``'digest'``, ``'compress'`` and ``'curve'`` to lists of the names `gpg` reports.
+        """
+        if self._capabilities is None:
+            key = self._capabilities_key()
+            with _capabilities_lock:
+                if key not in _capabilities:
+                    capabilities = self._read_capability_cache(key)
+                    if capabilities is None:
+                        capabilities = self._probe_capabilities()
+                        self._write_capability_cache(key, capabilities)
+                    _capabilities[key] = capabilities
+                self._capabilities = _capabilities[key]
+        return self._capabilities
+
+    @property
+    def version(self):
+        """
+        The version of `gpg` as a tuple of ints, from `capabilities`.
+        """
+        return self.capabilities['version']
+
+    def _capabilities_key(self):
+        # Internal method: what a probe result depends on. A new or upgraded binary has a new mtime
+        path = shutil.which(self.gpgbinary) or self.gpgbinary
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        return path, self.gnupghome, mtime
+
+    def _probe_capabilities(self):
+        # Internal method: run `gpg --list-config` and parse what it reports
         try:
             p = self._open_subprocess(['--list-config', '--with-colons'])
         except OSError:
@@ -1096,16 +1553,54 @@ class GPG(object):
         self._collect_output(p, result, stdin=p.stdin)
         if p.returncode != 0:  # pragma: no cover
             raise ValueError('Error invoking gpg: %s: %s' % (p.returncode, result.stderr))
+        capabilities = {'version': None}
         m = VERSION_RE.match(result.data)
-        if not m:  # pragma: no cover
-            self.version = None
-        else:
+        if m:
             dot = '.'.encode('ascii')
-            self.version = tuple([int(s) for s in m.groups()[0].split(dot)])
-
-        # See issue #97. It seems gpg allow duplicate keys in keyrings, so we
-        # can't be too strict.
-        self.check_fingerprint_collisions = False
+            capabilities['version'] = tuple([int(s) for s in m.groups()[0].split(dot)])
+        for line in result.data.decode(self.encoding).splitlines():
+            parts = line.split(':', 2)
+            if len(parts) < 3 or parts[0] != 'cfg':
+                continue
+            # e.g. cfg:ciphername:IDEA;3DES;...; the numeric cfg:cipher line lists the same algorithms by id
+            if parts[1].endswith('name'):
+                capabilities[parts[1][:-4]] = parts[2].split(';')
+            elif parts[1] == 'curve':
+                capabilities['curve'] = parts[2].split(';')
+        return capabilities
+
+    def _read_capability_cache(self, key):
+        # Internal method: the capabilities stored for key in the cache file, or None
+        if not self.capability_cache_file:
+            return None
+        try:
+            with open(self.capability_cache_file) as f:
+                capabilities = json.load(f)[json.dumps(key)]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if capabilities.get('version') is not None:
+            capabilities['version'] = tuple(capabilities['version'])
+        return capabilities
+
+    def _write_capability_cache(self, key, capabilities):
+        # Internal method: add capabilities to the cache file, replacing it atomically
+        if not self.capability_cache_file:
+            return
+        try:
+            with open(self.capability_cache_file) as f:
+                cache = json.load(f)
+            if not isinstance(cache, dict):  # pragma: no cover
+                cache = {}
+        except (OSError, ValueError):
+            cache = {}
+        cache[json.dumps(key)] = capabilities
+        tmp = '%s.%d.tmp' % (self.capability_cache_file, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp, self.capability_cache_file)
+        except OSError:  # pragma: no cover
+            logger.warning('Unable to write gpg capability cache %s', self.capability_cache_file, exc_info=1)
 
     def make_args(self, args, passphrase):
         """
@@ -1120,9 +1615,8 @@ class GPG(object):
         cmd = [self.gpgbinary, '--status-fd', '2', '--no-tty', '--no-verbose']
         if 'DEBUG_IPC' in os.environ:  # pragma: no cover
             cmd.extend(['--debug', 'ipc'])
-        if passphrase and hasattr(self, 'version'):
-            if self.version >= (2, 1):
-                cmd[1:1] = ['--pinentry-mode', 'loopback']
+        if passphrase and self.version >= (2, 1):
+            cmd[1:1] = ['--pinentry-mode', 'loopback']
         cmd.extend(['--fixed-list-mode', '--batch', '--with-colons'])
         if self.gnupghome:
             cmd.extend(['--homedir', no_quote(self.gnupghome)])
@@ -1142,15 +1636,25 @@ class GPG(object):
         cmd.extend(args)
         return cmd
 
-    def _open_subprocess(self, args, passphrase=False):
+    def _open_subprocess(self, args, passphrase=False, pooled=False):
         # Internal method: open a pipe to a GPG subprocess and return
-        # the file objects for communicating with it.
+        # the file objects for communicating with it. If pooled is True
+        # and there is a process pool, a waiting process is used instead.
 
         from subprocess import list2cmdline as debug_print
 
         cmd = self.make_args(args, passphrase)
         if self.verbose:  # pragma: no cover
             print(debug_print(cmd))
+        if pooled and self.process_pool is not None:
+            return self.process_pool.acquire(cmd)
+        return self._popen(cmd)
+
+    def _popen(self, cmd):
+        # Internal method: start a GPG subprocess for a full command line.
+
+        from subprocess import list2cmdline as debug_print
+
         if not STARTUPINFO:
             si = None
         else:  # pragma: no cover
@@ -1193,7 +1697,7 @@ class GPG(object):
         # Read the contents of the file from GPG's stdout
         chunks = []
         while True:
-            data = stream.read(1024)
+            data = stream.read(self.buffer_size)
             if len(data) == 0:
                 if on_data:
                     on_data(data)
@@ -1217,6 +1721,8 @@ class GPG(object):
         to the subprocess) is given, make sure it's joined before returning. If a stdin stream is given, close it
         before returning.
         """
+        if writer is None and self.io_mode == 'select':
+            return self._collect_output_select(process, result, None, stdin)
         stderr = codecs.getreader(self.encoding)(process.stderr)
         rr = threading.Thread(target=self._read_response, args=(stderr, result))
         rr.daemon = True
@@ -1233,6 +1739,27 @@ class GPG(object):
         rr.join()
         if writer is not None:
             writer.join(0.01)
+        return self._wait_for_process(process, result, stdin)
+
+    def _collect_output_select(self, process, result, fileobj=None, stdin=None):
+        """
+        Like `_collect_output()`, but without threads: the contents of fileobj (if given) are written to the
+        subprocess while its output streams are drained, all from a selector on the calling thread.
+        """
+        if stdin is not None:
+            # Anything buffered, e.g. a passphrase, must go out before writes bypass the buffer
+            stdin.flush()
+        stream = _SelectorStream(process, fileobj, self.encoding, self.buffer_size)
+        try:
+            self._read_data(stream, result, self.on_data)
+            stderr = stream.drain()
+        finally:
+            stream.close()
+        self._read_response(StringIO(stderr), result)
+        return self._wait_for_process(process, result, stdin)
+
+    def _wait_for_process(self, process, result, stdin=None):
+        # Internal method: reap the subprocess, record its return code and close its streams
         process.wait()
         result.returncode = rc = process.returncode
         if rc != 0:
@@ -1242,8 +1769,8 @@ class GPG(object):
                 stdin.close()
             except IOError:  # pragma: no cover
                 pass
-        stderr.close()
-        stdout.close()
+        process.stderr.close()
+        process.stdout.close()
         return rc
 
     def is_valid_file(self, fileobj):
@@ -1273,19 +1800,26 @@ class GPG(object):
         # Handle a basic data call - pass data to GPG, handle the output
         # including status information. Garbage In, Garbage Out :)
         fileobj = self._get_fileobj(fileobj_or_path)
+        p = writer = None
         try:
-            p = self._open_subprocess(args, passphrase is not None)
+            p = self._open_subprocess(args, passphrase is not None, pooled=True)
             if not binary:  # pragma: no cover
                 stdin = codecs.getwriter(self.encoding)(p.stdin)
             else:
                 stdin = p.stdin
             if passphrase:
                 _write_passphrase(stdin, passphrase, self.encoding)
-            writer = _threaded_copy_data(fileobj, stdin)
-            self._collect_output(p, result, writer, stdin)
+            if self.io_mode == 'select':
+                self._collect_output_select(p, result, fileobj, stdin)
+            else:
+                writer = _threaded_copy_data(fileobj, stdin, self.buffer_size)
+                self._collect_output(p, result, writer, stdin)
             return result
         finally:
-            writer.join(0.01)
+            if p is not None and self.process_pool is not None:
+                self.process_pool.release(p)
+            if writer is not None:
+                writer.join(0.01)
             if fileobj is not fileobj_or_path:
                 fileobj.close()
 
@@ -1407,7 +1941,7 @@ class GPG(object):
             stdin = p.stdin
             if passphrase:
                 _write_passphrase(stdin, passphrase, self.encoding)
-            writer = _threaded_copy_data(fileobj, stdin)
+            writer = _threaded_copy_data(fileobj, stdin, self.buffer_size)
         except IOError:  # pragma: no cover
             logging.exception('error writing message')
             writer = None
@@ -0,0 +1,139 @@
+"""Key derivation profiles for Cryptdict
+
+Usage: python kdf.py [--kdf NAME] [--target SECONDS] [--max-memory BYTES]
+"""
+from hashlib import pbkdf2_hmac
+from time import perf_counter
+
+try:
+    from hashlib import scrypt
+except ImportError:  # pragma: no cover
+    # hashlib only has scrypt when it is built against OpenSSL 1.1+
+    scrypt = None
+
+try:
+    from argon2.exceptions import HashingError
+    from argon2.low_level import ARGON2_VERSION, Type, core, error_to_str, ffi, lib
+except ImportError:  # pragma: no cover
+    core = None
+
+
+# Each profile lists KDFs in order of preference, the first one available is used
+KDF_PROFILES = {
+    "interactive": (("scrypt", {"n": 1 << 10, "r": 8, "p": 1}),
+                    ("pbkdf2", {"iterations": 100_000})),
+    "batch": (("scrypt", {"n": 1 << 14, "r": 8, "p": 1}),
+              ("pbkdf2", {"iterations": 600_000})),
+    "paranoid": (("argon2id", {"time_cost": 4, "memory_cost": 1 << 18, "parallelism": 4}),
+                 ("scrypt", {"n": 1 << 17, "r": 8, "p": 4}),
+                 ("pbkdf2", {"iterations": 2_000_000})),
+}
+
+
+def _scrypt(password, salt, dklen, n, r, p):
+    # OpenSSL refuses anything over 32 MB unless maxmem says otherwise
+    return scrypt(password, salt=salt, n=n, r=r, p=p, dklen=dklen,
+                  maxmem=128 * r * (n + p + 2) + (1 << 16))
+
+
+def _pbkdf2(password, salt, dklen, iterations):
+    return pbkdf2_hmac("sha512", password, salt, iterations, dklen)
+
+
+def _argon2id(password, salt, dklen, time_cost, memory_cost, parallelism):
+    # memory_cost is in KiB. hash_secret_raw would copy password and salt into
+    # buffers that are freed unwiped and return the key as bytes, so libargon2
+    # is pointed at the caller's buffers and writes into a bytearray instead
+    key = bytearray(dklen)
+    context = ffi.new("argon2_context *", {
+        "out": ffi.from_buffer("uint8_t[]", key, require_writable=True), "outlen": dklen,
+        "pwd": ffi.from_buffer("uint8_t[]", password), "pwdlen": len(password),
+        "salt": ffi.from_buffer("uint8_t[]", salt), "saltlen": len(salt),
+        "secret": ffi.NULL, "secretlen": 0, "ad": ffi.NULL, "adlen": 0,
+        "t_cost": time_cost, "m_cost": memory_cost, "lanes": parallelism, "threads": parallelism,
+        "version": ARGON2_VERSION, "allocate_cbk": ffi.NULL, "free_cbk": ffi.NULL,
+        "flags": lib.ARGON2_DEFAULT_FLAGS})
+    error = core(context, Type.ID.value)
+    if error != lib.ARGON2_OK:
+        raise HashingError(error_to_str(error))
+    return key
+
+
+KDFS = {
+    "argon2id": _argon2id if core is not None else None,
+    "scrypt": _scrypt if scrypt is not None else None,
+    "pbkdf2": _pbkdf2,
+}
+
+
+def available_kdfs():
+    return tuple(name for name, kdf in KDFS.items() if kdf is not None)
+
+
+def resolve_profile(profile):
+    """Returns (kdf name, params) for a profile name or a list of (kdf name, params) pairs"""
+    choices = KDF_PROFILES[profile] if isinstance(profile, str) else profile
+    for name, params in choices:
+        if KDFS.get(name) is not None:
+            return name, params
+    raise ValueError(f"None of {', '.join(name for name, _ in choices)} is available")
+
+
+def derive_key(password, salt, profile="interactive", dklen=64):
+    """Derives dklen bytes from password and salt with the first available KDF
+    of profile. argon2id returns a bytearray for the caller to wipe. hashlib
+    only returns bytes, so scrypt and pbkdf2 keys are an immutable copy"""
+    name, params = resolve_profile(profile)
+    return KDFS[name](password, salt, dklen, **params)
+
+
+def time_kdf(name, params, dklen=64):
+    start = perf_counter()
+    KDFS[name](b"calibrate", b"\0" * 16, dklen, **params)
+    return perf_counter() - start
+
+
+def calibrate(name="scrypt", target=0.25, max_memory=1 << 28):
+    """Measures this machine and returns (params, seconds) for the cheapest
+    parameters of the named KDF that take at least target seconds. The work
+    factor is doubled each step, memory hard KDFs stop growing their memory
+    at max_memory bytes and raise the time cost instead"""
+    if KDFS.get(name) is None:
+        raise ValueError(f"{name} is not available, try one of {', '.join(available_kdfs())}")
+
+    if name == "scrypt":
+        params = {"n": 1 << 10, "r": 8, "p": 1}
+        grow = lambda params: ({**params, "n": params["n"] * 2}
+                               if 128 * params["r"] * params["n"] * 2 <= max_memory
+                               else {**params, "p": params["p"] * 2})
+    elif name == "argon2id":
+        params = {"time_cost": 1, "memory_cost": 1 << 13, "parallelism": 4}
+        grow = lambda params: ({**params, "memory_cost": params["memory_cost"] * 2}
+                               if params["memory_cost"] * 2 * 1024 <= max_memory
+                               else {**params, "time_cost": params["time_cost"] * 2})
+    else:
+        params = {"iterations": 10_000}
+        grow = lambda params: {"iterations": params["iterations"] * 2}
+
+    seconds = time_kdf(name, params)
+    while seconds < target:
+        params = grow(params)
+        seconds = time_kdf(name, params)
+    return params, seconds
+
+
+if __name__ == "__main__":
+    # Only the command line needs argparse, so importing kdf stays cheap
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Pick KDF parameters that take a target time on this machine")
+    parser.add_argument("--kdf", choices=available_kdfs(), action="append",
+                        help="KDF to calibrate, may be repeated (default: all available)")
+    parser.add_argument("--target", type=float, default=0.25, help="seconds per derivation")
+    parser.add_argument("--max-memory", type=int, default=1 << 28,
+                        help="most memory a memory hard KDF may use")
+    args = parser.parse_args()
+
+    for name in args.kdf or available_kdfs():
+        params, seconds = calibrate(name, args.target, args.max_memory)
+        print(f"{name:>10}: {params} ({seconds * 1e3:,.0f} ms)")
@@ -0,0 +1,288 @@
+import mmap
+from threading import Lock, Timer
+
+from bytestr import bytestr
+
+try:
+    import ctypes
+    # libc is already loaded into the process, so its symbols are found without
+    # ctypes.util.find_library, which runs ldconfig in a subprocess
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _libc.mlock
+except (ImportError, OSError, AttributeError, TypeError):  # pragma: no cover
+    _libc = None
+
+
+PAGE_SIZE = mmap.PAGESIZE
+MIN_SLAB_SIZE = 32
+
+
+def lock_region(region):
+    """Locks an mmap region into RAM and excludes it from core dumps where supported.
+    Returns True if the region was locked"""
+    if hasattr(mmap, "MADV_DONTDUMP"):
+        region.madvise(mmap.MADV_DONTDUMP)
+    if _libc is None:
+        return False
+
+    buffer = ctypes.c_char.from_buffer(region)
+    address = ctypes.addressof(buffer)
+    del buffer
+    return _libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(len(region))) == 0
+
+
+def unlock_region(region):
+    if _libc is None:
+        return
+    buffer = ctypes.c_char.from_buffer(region)
+    address = ctypes.addressof(buffer)
+    del buffer
+    _libc.munlock(ctypes.c_void_p(address), ctypes.c_size_t(len(region)))
+
+
+class Slab(object):
+    """Fixed size window of a SlabPool arena"""
+
+    def __init__(self, pool, arena, offset):
+        self.pool = pool
+        self.arena = arena
+        self.offset = offset
+        self.size = pool.slab_size
+        self.view = memoryview(arena)[offset:offset + self.size]
+
+    def find(self, sub, start=0, end=None):
+        # mmap.find searches the arena in place so nothing is copied
+        end = self.size if end is None else end
+        index = self.arena.find(sub, self.offset + start, self.offset + end)
+        return index - self.offset if index >= 0 else -1
+
+
+class SlabPool(object):
+    """Hands out fixed size slabs carved from anonymous mmap arenas that are
+    locked into RAM, so many small secrets share a few locked pages"""
+
+    def __init__(self, slab_size=256, arena_size=16 * PAGE_SIZE):
+        self.slab_size = slab_size
+        # Arenas are whole pages and hold at least one slab
+        arena_size = max(arena_size, slab_size)
+        self.arena_size = -(-arena_size // PAGE_SIZE) * PAGE_SIZE
+        self.arenas = []
+        self.free_slabs = []
+        self.locked = True
+        self.lock = Lock()
+
+    def _add_arena(self):
+        arena = mmap.mmap(-1, self.arena_size)
+        self.locked = lock_region(arena) and self.locked
+        self.arenas.append(arena)
+        self.free_slabs.extend(Slab(self, arena, offset) for offset in
+                               range(self.arena_size - self.slab_size, -1, -self.slab_size))
+
+    def acquire(self):
+        """Returns a zeroed Slab"""
+        with self.lock:
+            if not self.free_slabs:
+                self._add_arena()
+            return self.free_slabs.pop()
+
+    def release(self, slab):
+        """Wipes slab and returns it to the free list"""
+        bytestr.fill(slab.view, 0)
+        with self.lock:
+            self.free_slabs.append(slab)
+
+    def close(self):
+        """Wipes, unlocks and unmaps every arena. All slabs must have been released"""
+        with self.lock:
+            for slab in self.free_slabs:
+                slab.view.release()
+            self.free_slabs.clear()
+            for arena in self.arenas:
+                bytestr.fill(arena, 0)
+                unlock_region(arena)
+                arena.close()
+            self.arenas.clear()
+
+
+# One pool per power of two slab size, shared by every LockedBytestr
+slab_pools = {}
+slab_pools_lock = Lock()
+
+
+def get_slab_pool(size):
+    """Returns the shared SlabPool for the smallest size class that holds size bytes"""
+    slab_size = max(MIN_SLAB_SIZE, 1 << (max(size, 1) - 1).bit_length())
+    with slab_pools_lock:
+        if slab_size not in slab_pools:
+            slab_pools[slab_size] = SlabPool(slab_size)
+        return slab_pools[slab_size]
+
+
+class LockedBytestr(object):
+    """Secret buffer like bytestr whose bytes live in a locked SlabPool slab
+    instead of the regular heap"""
+
+    def __init__(self, data=b"", capacity=0, clearmem_on_stream=True):
+        self.clearmem_on_stream = clearmem_on_stream
+        self.slab = get_slab_pool(max(len(data), capacity)).acquire()
+        self.length = 0
+        self.extend(data)
+        bytestr.destroy(data)
+
+    def __del__(self):
+        self.destroy()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.destroy()
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return "".join(chr(_int) for _int in self.view)
+
+    def __iter__(self):
+        return iter(self.view)
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    def __setitem__(self, index, value):
+        self.view[index] = value
+
+    def __contains__(self, item):
+        return self.find(item) >= 0
+
+    def __eq__(self, other):
+        buf = bytestr.parse_buffer(other)
+        return buf is not None and self.view == buf
+
+    @property
+    def view(self):
+        """memoryview of the used part of the slab"""
+        return self.slab.view[:self.length]
+
+    @property
+    def capacity(self):
+        return self.slab.size
+
+    def find(self, sub, start=0, end=None):
+        end = self.length if end is None else min(end, self.length)
+        return self.slab.find(bytestr.parse_buffer(sub), start, end)
+
+    def append(self, item):
+        if not isinstance(item, int):
+            return self.extend(item)
+        if self.length + 1 > self.slab.size:
+            self._move_to(self.length + 1)
+        self.slab.view[self.length] = item
+        self.length += 1
+
+    def extend(self, data):
+        buf = bytestr.parse_buffer(data)
+        if buf is None:
+            for item in data:
+                self.append(item)
+            return
+        size = len(buf)
+        if self.length + size > self.slab.size:
+            self._move_to(self.length + size)
+        self.slab.view[self.length:self.length + size] = buf
+        self.length += size
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def _move_to(self, size):
+        # Copies the contents into a slab from a bigger size class and wipes the old one
+        slab = get_slab_pool(size).acquire()
+        slab.view[:self.length] = self.view
+        self.slab.pool.release(self.slab)
+        self.slab = slab
+
+    def clearmem(self):
+        bytestr.fill(self.slab.view, 0)
+        self.length = 0
+
+    def destroy(self):
+        if getattr(self, "slab", None) is not None:
+            self.length = 0
+            self.slab.pool.release(self.slab)
+            self.slab = None
+
+    def streaminto(self, fn, format_fn=chr):
+        for _int in self.view:
+            fn(format_fn(_int))
+        if self.clearmem_on_stream:
+            self.clearmem()
+
+
+class ExpiringSecret(object):
+    """Cache for one derived secret kept in a LockedBytestr. The secret is
+    wiped once it is ttl seconds old or has been handed out max_uses times,
+    whichever comes first, and the next get derives it again"""
+
+    def __init__(self, ttl=300, max_uses=None):
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.secret = None
+        self.uses = 0
+        self.timer = None
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.lock = Lock()
+
+    @property
+    def stats(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations}
+
+    def get(self, derive):
+        """Returns a private LockedBytestr copy of the cached secret, which the
+        caller destroys when done so expiry never pulls it out from under
+        them. On a miss derive() is called and the bytestr it returns is
+        copied into locked memory and destroyed"""
+        with self.lock:
+            if self.max_uses is not None and self.uses >= self.max_uses:
+                self._wipe()
+                self.expirations += 1
+            if self.secret is None:
+                self.misses += 1
+                self.secret = LockedBytestr(derive())
+                if self.ttl is not None:
+                    self.timer = Timer(self.ttl, self._expire, (self.secret,))
+                    self.timer.daemon = True
+                    self.timer.start()
+            else:
+                self.hits += 1
+            self.uses += 1
+            copy = LockedBytestr(capacity=len(self.secret))
+            copy.extend(self.secret.view)
+            return copy
+
+    def invalidate(self):
+        """Wipes the cached secret now"""
+        with self.lock:
+            self._wipe()
+
+    def _expire(self, secret):
+        with self.lock:
+            # Only the secret the timer was started for, it may already be replaced
+            if secret is self.secret:
+                self._wipe()
+                self.expirations += 1
+
+    def _wipe(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.secret is not None:
+            self.secret.destroy()
+            self.secret = None
+        self.uses = 0